@@ -0,0 +1,40 @@
+"""Stream an NDJSON file into Mongo through the same path as POST /api/admin/import/{kind}.
+
+Usage: python bulk_import.py {tutorials,blog,faqs} FILE [--chunk-size N]
+Use "-" as FILE to read from stdin.
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from server import BulkImport, IMPORT_KINDS, IMPORT_CHUNK_SIZE, client
+
+
+async def read_lines(path):
+    stream = sys.stdin.buffer if path == "-" else open(path, "rb")
+    try:
+        for line in stream:
+            yield line
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Bulk import NDJSON into Tutoria Fácil")
+    parser.add_argument("kind", choices=sorted(IMPORT_KINDS))
+    parser.add_argument("file", help="NDJSON file, or - for stdin")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    try:
+        stats = await BulkImport(args.kind, chunk_size=args.chunk_size).run(read_lines(args.file))
+    finally:
+        client.close()
+    print(json.dumps(stats, ensure_ascii=False, indent=2))
+    return 1 if stats["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,160 @@
+"""Online migration of legacy documents to the compact storage format (see STORAGE FORMAT in server.py).
+
+Usage: python migrate_compact.py [--batch-size N] [--pause SECONDS] [--compact]
+
+Legacy documents are recognized by their string `id` field, so the migration
+is resumable by construction: each batch rewrites documents under their binary
+UUID `_id` and deletes the originals, and a rerun simply picks up whatever still
+has an `id`. The server keeps serving throughout, since it matches both layouts
+while STORAGE_LEGACY_READS is on. Collection and index sizes are reported before
+and after; pass --compact to reclaim the freed disk space.
+
+An original is only deleted while it still equals the copy that was read, so a
+view count, rating or admin edit that lands mid-batch is never overwritten: that
+document is left in place and migrated again from its new state. On a replica
+set each batch runs in a transaction, so readers never see both copies or
+neither. On a standalone server the compact copies are journaled in
+_migrate_compact_pending before the originals are deleted and written right
+after; a document is briefly absent in between, and the journal is replayed if
+the migration stops at that point.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from pymongo import DeleteOne, ReplaceOne
+
+from server import client, db, to_storage
+
+COLLECTIONS = ["categories", "tutorials", "comments", "blog_posts", "faqs", "contacts"]
+PENDING = "_migrate_compact_pending"
+
+
+async def collection_sizes(name):
+    stats = await db.command("collStats", name)
+    return {
+        "count": stats.get("count", 0),
+        "size": stats.get("size", 0),
+        "avg_obj_size": stats.get("avgObjSize", 0),
+        "storage_size": stats.get("storageSize", 0),
+        "total_index_size": stats.get("totalIndexSize", 0),
+        "index_sizes": stats.get("indexSizes", {}),
+    }
+
+
+async def supports_transactions():
+    hello = await client.admin.command("hello")
+    return "setName" in hello or hello.get("msg") == "isdbgrid"
+
+
+def compact(doc):
+    return to_storage({k: v for k, v in doc.items() if k != "_id"})
+
+
+def unchanged(doc):
+    # Matches the original only while it still equals the copy that was read
+    return {"_id": doc["_id"], "$expr": {"$eq": ["$$ROOT", {"$literal": doc}]}}
+
+
+async def move_batch(collection, batch, session=None):
+    """Delete the originals that are unchanged since they were read and write their compact copies."""
+    await collection.bulk_write([DeleteOne(unchanged(doc)) for doc in batch], ordered=False, session=session)
+    still_there = await collection.find(
+        {"_id": {"$in": [doc["_id"] for doc in batch]}}, {"_id": 1}, session=session
+    ).to_list(None)
+    still_there = {doc["_id"] for doc in still_there}
+    moved = [compact(doc) for doc in batch if doc["_id"] not in still_there]
+    if moved:
+        # Upserting by the new _id keeps a replayed batch idempotent
+        await collection.bulk_write(
+            [ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in moved], ordered=False, session=session
+        )
+    return len(moved)
+
+
+async def move_batch_journaled(name, collection, batch):
+    pending = db[PENDING]
+    await pending.bulk_write([
+        ReplaceOne({"_id": doc["_id"]}, {"_id": doc["_id"], "collection": name, "document": compact(doc)}, upsert=True)
+        for doc in batch
+    ], ordered=False)
+    moved = await move_batch(collection, batch)
+    await pending.delete_many({"_id": {"$in": [doc["_id"] for doc in batch]}})
+    return moved
+
+
+async def replay_pending(name, collection):
+    """Finish moves interrupted between deleting an original and writing its compact copy."""
+    async for entry in db[PENDING].find({"collection": name}):
+        if await collection.count_documents({"_id": entry["_id"]}) == 0:
+            # Only fill the gap; a compact copy that already exists may have newer writes
+            document = dict(entry["document"])
+            await collection.update_one(
+                {"_id": document.pop("_id")}, {"$setOnInsert": document}, upsert=True
+            )
+        await db[PENDING].delete_one({"_id": entry["_id"]})
+
+
+async def migrate_collection(name, batch_size, pause, transactions):
+    collection = db[name]
+    await replay_pending(name, collection)
+    remaining = await collection.count_documents({"id": {"$exists": True}})
+    migrated = 0
+    retried = 0
+    started = time.perf_counter()
+    while True:
+        batch = await collection.find({"id": {"$exists": True}}).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+        if transactions:
+            async with await client.start_session() as session:
+                moved = await session.with_transaction(lambda s: move_batch(collection, batch, s))
+        else:
+            moved = await move_batch_journaled(name, collection, batch)
+        # Documents written to since they were read stay behind and are picked up by the next batch
+        migrated += moved
+        retried += len(batch) - moved
+        print(f"{name}: {migrated}/{remaining} migrated", flush=True)
+        if pause:
+            await asyncio.sleep(pause)
+    # The old full `id` index is replaced by a partial one the server creates on startup
+    indexes = await collection.index_information()
+    if "id_1" in indexes and "partialFilterExpression" not in indexes["id_1"]:
+        await collection.drop_index("id_1")
+    return {"migrated": migrated, "retried": retried, "seconds": round(time.perf_counter() - started, 3)}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Migrate documents to the compact storage format")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--pause", type=float, default=0.05, help="seconds to sleep between batches")
+    parser.add_argument("--compact", action="store_true", help="run the compact command afterwards")
+    args = parser.parse_args()
+
+    report = {}
+    try:
+        existing = set(await db.list_collection_names())
+        transactions = await supports_transactions()
+        for name in COLLECTIONS:
+            if name not in existing:
+                continue
+            before = await collection_sizes(name)
+            result = await migrate_collection(name, args.batch_size, args.pause, transactions)
+            if args.compact:
+                await db.command("compact", name)
+            after = await collection_sizes(name)
+            report[name] = {**result, "before": before, "after": after}
+    finally:
+        client.close()
+
+    print(f"\n{'collection':<12} {'docs':>8} {'size before':>12} {'size after':>12} {'idx before':>12} {'idx after':>12}")
+    for name, entry in report.items():
+        before, after = entry["before"], entry["after"]
+        print(f"{name:<12} {after['count']:>8} {before['size']:>12} {after['size']:>12} "
+              f"{before['total_index_size']:>12} {after['total_index_size']:>12}")
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
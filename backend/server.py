@@ -1,34 +1,762 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request
+from fastapi.responses import JSONResponse, Response
+from fastapi.routing import APIRoute
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+import pymongo
+from pymongo import monitoring, UpdateOne, UpdateMany, DeleteMany, ReturnDocument
+from pymongo.errors import BulkWriteError, ConnectionFailure, ExecutionTimeout, OperationFailure
+from bson import json_util, Binary, ObjectId
+from bson.binary import UUID_SUBTYPE
 import os
+import asyncio
 import logging
+import threading
+import copy
+import json
+import time
+import random
+import math
+import functools
+import importlib
+import contextvars
+import queue
+import logging.handlers
+import hashlib
+import heapq
+import ipaddress
+import bisect
+import re
+import unicodedata
+import zlib
+import io
+from urllib.parse import urljoin, urlparse
+from contextlib import contextmanager, asynccontextmanager
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, ValidationError
 from typing import List, Optional
+from collections import OrderedDict, deque
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
 import secrets
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# ==================== REQUEST TRACING ====================
+
+TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', '0.01'))
+TRACE_LOG_PATH = Path(os.environ.get('TRACE_LOG_PATH', ROOT_DIR / 'logs' / 'traces.jsonl'))
+TRACE_LOG_MAX_BYTES = int(os.environ.get('TRACE_LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+TRACE_LOG_BACKUPS = int(os.environ.get('TRACE_LOG_BACKUPS', '5'))
+SERVER_TIMING_MAX_ENTRIES = 20
+
+class RequestTrace:
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.started_at = datetime.now(timezone.utc)
+        self.start = time.perf_counter()
+        # (name, duration_ms, description); appended from Motor executor threads too
+        self.phases = []
+        self.route_start = None
+        self.route_end = None
+        self.handler_start = None
+        self.handler_end = None
+
+    def add(self, name, duration_ms, desc=None):
+        self.phases.append((name, duration_ms, desc))
+
+    def breakdown(self):
+        phases = list(self.phases)
+        if self.handler_start is not None and self.handler_end is not None:
+            phases.append(("handler", (self.handler_end - self.handler_start) * 1000, None))
+            if self.route_start is not None:
+                phases.append(("validate", (self.handler_start - self.route_start) * 1000, "dependencies and request parsing"))
+            if self.route_end is not None:
+                phases.append(("serialize", (self.route_end - self.handler_end) * 1000, "response validation and encoding"))
+        db_total = sum(duration for name, duration, _ in phases if name == "db")
+        phases.append(("db-total", db_total, None))
+        phases.append(("total", (time.perf_counter() - self.start) * 1000, None))
+        return phases
+
+request_trace = contextvars.ContextVar("request_trace", default=None)
+
+@contextmanager
+def trace_phase(name, desc=None):
+    trace = request_trace.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if trace is not None:
+            trace.add(name, (time.perf_counter() - start) * 1000, desc)
+
+def server_timing_header(phases):
+    db_phases = [p for p in phases if p[0] == "db"]
+    other_phases = [p for p in phases if p[0] != "db"]
+    entries = []
+    for name, duration, desc in other_phases + db_phases[:SERVER_TIMING_MAX_ENTRIES]:
+        entry = f"{name};dur={duration:.2f}"
+        if desc:
+            entry += ';desc="' + desc.replace('"', "'") + '"'
+        entries.append(entry)
+    return ", ".join(entries)
+
+def timed_endpoint(endpoint):
+    if getattr(endpoint, "__timed__", False):
+        return endpoint
+
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        trace = request_trace.get()
+        if trace is not None:
+            trace.handler_start = time.perf_counter()
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            if trace is not None:
+                trace.handler_end = time.perf_counter()
+
+    wrapper.__timed__ = True
+    return wrapper
+
+class TimedRoute(APIRoute):
+    """Marks where FastAPI hands over to the endpoint, so validation and serialization can be told apart from handler time."""
+
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, timed_endpoint(endpoint), **kwargs)
+        self.db_deadline = route_db_deadline(self.path)
+        self.db_guarded = self.path not in BREAKER_EXEMPT_PATHS
+
+    def get_route_handler(self):
+        route_handler = super().get_route_handler()
+
+        async def timed_route_handler(request):
+            trace = request_trace.get()
+            if trace is not None:
+                trace.route_start = time.perf_counter()
+            try:
+                if not self.db_guarded:
+                    return await route_handler(request)
+                return await guarded_call(route_handler, request, self.db_deadline)
+            finally:
+                if trace is not None:
+                    trace.route_end = time.perf_counter()
+
+        return timed_route_handler
+
+def build_trace_logger():
+    trace_logger = logging.getLogger("tutoria.traces")
+    trace_logger.propagate = False
+    if TRACE_SAMPLE_RATE <= 0:
+        return trace_logger
+    TRACE_LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+    file_handler = logging.handlers.RotatingFileHandler(
+        TRACE_LOG_PATH, maxBytes=TRACE_LOG_MAX_BYTES, backupCount=TRACE_LOG_BACKUPS, encoding="utf-8"
+    )
+    file_handler.setFormatter(logging.Formatter("%(message)s"))
+    # File writes happen on the listener thread, never on the event loop
+    trace_queue = queue.SimpleQueue()
+    trace_logger.addHandler(logging.handlers.QueueHandler(trace_queue))
+    trace_logger.setLevel(logging.INFO)
+    listener = logging.handlers.QueueListener(trace_queue, file_handler)
+    listener.start()
+    return trace_logger
+
+trace_logger = build_trace_logger()
+
+class ServerTimingMiddleware:
+    """Emits a Server-Timing header for every request and logs a sample of full traces."""
+
+    def __init__(self, app, timing_allow_origin="*"):
+        self.app = app
+        self.timing_allow_origin = timing_allow_origin
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trace = RequestTrace(scope["method"], scope["path"])
+        token = request_trace.set(trace)
+        status = {"code": None}
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing_header(trace.breakdown()).encode("latin-1")))
+                headers.append((b"timing-allow-origin", self.timing_allow_origin.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_trace.reset(token)
+            if TRACE_SAMPLE_RATE > 0 and random.random() < TRACE_SAMPLE_RATE:
+                trace_logger.info(json.dumps({
+                    "timestamp": trace.started_at.isoformat(),
+                    "method": trace.method,
+                    "path": trace.path,
+                    "query": scope.get("query_string", b"").decode("latin-1"),
+                    "status": status["code"],
+                    "phases": [{"name": n, "ms": round(d, 3), "desc": desc} for n, d, desc in trace.breakdown()],
+                }))
+
+# ==================== QUERY PROFILER ====================
+
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '50'))
+EXPLAIN_SAMPLE_SECONDS = float(os.environ.get('EXPLAIN_SAMPLE_SECONDS', '300'))
+EXPLAIN_VERBOSITY = os.environ.get('EXPLAIN_VERBOSITY', 'queryPlanner')
+EXPLAIN_TIMEOUT_SECONDS = float(os.environ.get('EXPLAIN_TIMEOUT_SECONDS', '10'))
+PROFILER_MAX_SHAPES = int(os.environ.get('PROFILER_MAX_SHAPES', '500'))
+
+PROFILED_COMMANDS = {"find", "aggregate", "count", "distinct", "update", "delete", "insert", "findAndModify"}
+EXPLAINABLE_COMMANDS = PROFILED_COMMANDS - {"insert"}
+# Session/transport fields that pymongo adds to every command and explain() rejects
+COMMAND_ENVELOPE_FIELDS = {"lsid", "txnNumber", "autocommit", "startTransaction", "readConcern", "writeConcern"}
+
+def query_shape(value):
+    """Replace literal values with placeholders so queries differing only in values group together."""
+    if isinstance(value, dict):
+        return {k: query_shape(v) for k, v in sorted(value.items())}
+    if isinstance(value, (list, tuple)):
+        if value and all(isinstance(v, dict) for v in value):
+            return [query_shape(v) for v in value]
+        return "?"
+    return "?"
+
+def command_shape(command_name, command):
+    if command_name == "find":
+        return {"filter": query_shape(command.get("filter", {})), "sort": dict(command.get("sort") or {})}
+    if command_name == "aggregate":
+        return {"pipeline": query_shape(command.get("pipeline", []))}
+    if command_name in ("count", "distinct"):
+        return {"query": query_shape(command.get("query", {})), "key": command.get("key")}
+    if command_name == "findAndModify":
+        return {"query": query_shape(command.get("query", {})), "update": query_shape(command.get("update", {}))}
+    if command_name == "update":
+        return {"updates": [{"q": query_shape(u.get("q", {})), "u": query_shape(u.get("u", {}))} for u in command.get("updates", [])[:1]]}
+    if command_name == "delete":
+        return {"deletes": [{"q": query_shape(d.get("q", {}))} for d in command.get("deletes", [])[:1]]}
+    return {}
+
+def plan_stages(plan):
+    stages = []
+    while isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for child in plan.get("inputStages", []):
+            stages.extend(plan_stages(child))
+        plan = plan.get("inputStage") or plan.get("queryPlan")
+    return stages
+
+def winning_plan(explain):
+    planner = explain.get("queryPlanner")
+    if planner is None:
+        # Aggregations report the planner under their first $cursor stage
+        for stage in explain.get("stages", []):
+            if "$cursor" in stage:
+                planner = stage["$cursor"].get("queryPlanner")
+                break
+    return (planner or {}).get("winningPlan", {})
+
+class QueryProfiler(monitoring.CommandListener):
+    """Collects Mongo operations slower than SLOW_QUERY_MS, grouped by query shape.
+
+    pymongo calls the listener from Motor's executor threads, so all state is
+    guarded by a lock and explain() runs are handed back to the event loop.
+    """
+
+    def __init__(self, threshold_ms, max_shapes):
+        self.threshold_ms = threshold_ms
+        self.max_shapes = max_shapes
+        self.loop = None
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._shapes = {}
+
+    def started(self, event):
+        if event.command_name not in PROFILED_COMMANDS:
+            return
+        with self._lock:
+            if len(self._inflight) > 10000:
+                self._inflight.clear()
+            self._inflight[(event.connection_id, event.request_id)] = (event.database_name, event.command)
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed):
+        duration_ms = event.duration_micros / 1000
+        with self._lock:
+            inflight = self._inflight.pop((event.connection_id, event.request_id), None)
+        trace = request_trace.get()
+        if inflight is None:
+            if trace is not None:
+                trace.add("db", duration_ms, event.command_name)
+            return
+        database_name, command = inflight
+        command_name = event.command_name
+        collection = command.get(command_name)
+        if trace is not None:
+            trace.add("db", duration_ms, f"{command_name} {collection}")
+        if duration_ms < self.threshold_ms:
+            return
+        shape = command_shape(command_name, command)
+        key = f"{database_name}.{collection}:{command_name}:{shape}"
+        now = datetime.now(timezone.utc)
+        explain_command = None
+        with self._lock:
+            stats = self._shapes.get(key)
+            if stats is None:
+                if len(self._shapes) >= self.max_shapes:
+                    cheapest = min(self._shapes, key=lambda k: self._shapes[k]["total_ms"])
+                    del self._shapes[cheapest]
+                stats = self._shapes[key] = {
+                    "database": database_name,
+                    "collection": collection,
+                    "operation": command_name,
+                    "shape": shape,
+                    "count": 0,
+                    "errors": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "last_seen": None,
+                    "explain": None,
+                    "explained_at": None,
+                    "explain_pending": False,
+                }
+            stats["count"] += 1
+            stats["errors"] += int(failed)
+            stats["total_ms"] += duration_ms
+            stats["max_ms"] = max(stats["max_ms"], duration_ms)
+            stats["last_seen"] = now
+            due = stats["explained_at"] is None or (now - stats["explained_at"]).total_seconds() >= EXPLAIN_SAMPLE_SECONDS
+            if command_name in EXPLAINABLE_COMMANDS and due and not stats["explain_pending"] and self.loop is not None:
+                stats["explain_pending"] = True
+                explain_command = {k: copy.deepcopy(v) for k, v in command.items()
+                                   if not k.startswith("$") and k not in COMMAND_ENVELOPE_FIELDS}
+        if explain_command is not None:
+            # Scheduled from an empty context: the task would otherwise inherit the request's trace
+            # and its pymongo.timeout() deadline, which the slow query has mostly used up
+            contextvars.Context().run(
+                asyncio.run_coroutine_threadsafe, self._explain(key, database_name, explain_command), self.loop
+            )
+
+    async def _explain(self, key, database_name, command):
+        try:
+            with pymongo.timeout(EXPLAIN_TIMEOUT_SECONDS):
+                plan = await client[database_name].command({"explain": command, "verbosity": EXPLAIN_VERBOSITY})
+            plan = {k: v for k, v in plan.items() if k in ("queryPlanner", "executionStats", "stages", "command")}
+            # Explain output carries BSON-only types (Timestamp, Int64...), keep a JSON-safe copy
+            plan = json.loads(json_util.dumps(plan))
+        except Exception as e:
+            plan = {"error": str(e)}
+        with self._lock:
+            stats = self._shapes.get(key)
+            if stats is not None:
+                stats["explain"] = plan
+                stats["explained_at"] = datetime.now(timezone.utc)
+                stats["explain_pending"] = False
+
+    def report(self, limit):
+        with self._lock:
+            shapes = [dict(s) for s in self._shapes.values()]
+        shapes.sort(key=lambda s: s["total_ms"], reverse=True)
+        report = []
+        for stats in shapes[:limit]:
+            stages = plan_stages(winning_plan(stats["explain"] or {}))
+            stats.pop("explain_pending")
+            stats["avg_ms"] = round(stats["total_ms"] / stats["count"], 3)
+            stats["total_ms"] = round(stats["total_ms"], 3)
+            stats["max_ms"] = round(stats["max_ms"], 3)
+            stats["plan_stages"] = stages
+            stats["collection_scan"] = "COLLSCAN" in stages
+            report.append(stats)
+        return report
+
+    def reset(self):
+        with self._lock:
+            self._shapes.clear()
+
+query_profiler = QueryProfiler(SLOW_QUERY_MS, PROFILER_MAX_SHAPES)
+
 # MongoDB connection
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '100'))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '10'))
+
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(
+    mongo_url,
+    maxPoolSize=MONGO_MAX_POOL_SIZE,
+    minPoolSize=MONGO_MIN_POOL_SIZE,
+    maxIdleTimeMS=int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', '300000')),
+    waitQueueTimeoutMS=int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', '5000')),
+    connectTimeoutMS=int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', '5000')),
+    serverSelectionTimeoutMS=int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000')),
+    socketTimeoutMS=int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', '20000')),
+    uuidRepresentation="standard",
+    event_listeners=[query_profiler],
+)
 db = client[os.environ['DB_NAME']]
 
+# ==================== DB RESILIENCE ====================
+
+DB_DEADLINE_SECONDS = float(os.environ.get('DB_DEADLINE_SECONDS', '2'))
+DB_ADMIN_DEADLINE_SECONDS = float(os.environ.get('DB_ADMIN_DEADLINE_SECONDS', '10'))
+# Per-route overrides; 0 leaves the route without a deadline
+DB_ROUTE_DEADLINES = {
+    "/api/admin/seed": 30,
+    "/api/admin/import/{kind}": 0,
+}
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get('BREAKER_FAILURE_THRESHOLD', '5'))
+BREAKER_RESET_SECONDS = float(os.environ.get('BREAKER_RESET_SECONDS', '10'))
+# Routes that never touch Mongo, or check it themselves, stay outside the breaker
+BREAKER_EXEMPT_PATHS = {
+    "/api/", "/api/health/live", "/api/health/ready", "/api/images", "/api/autocomplete", "/api/admin/db/breaker",
+    "/api/admin/ingestion",
+}
+STALE_CACHE_SIZE = int(os.environ.get('STALE_CACHE_SIZE', '500'))
+STALE_MAX_AGE_SECONDS = float(os.environ.get('STALE_MAX_AGE_SECONDS', '3600'))
+
+def route_db_deadline(path):
+    deadline = DB_ROUTE_DEADLINES.get(path)
+    if deadline is None:
+        deadline = DB_ADMIN_DEADLINE_SECONDS if path.startswith("/api/admin/") else DB_DEADLINE_SECONDS
+    return deadline or None
+
+def is_db_outage(exc):
+    # Lost connections, network timeouts and failed server selection. A query that exceeds its own
+    # deadline (ExecutionTimeout) says nothing about Mongo's health, so one expensive request can't
+    # open the breaker for every route
+    return isinstance(exc, ConnectionFailure)
+
+class CircuitBreaker:
+    """Stops sending requests to Mongo after consecutive outage errors.
+
+    Opens after `failure_threshold` failures in a row; after `reset_timeout` one request is let
+    through as a probe, and its outcome closes the breaker again or re-opens it."""
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self.probe_inflight = False
+        self.stats = {"trips": 0, "recoveries": 0, "failures": 0, "rejected": 0, "stale_served": 0}
+
+    def allow(self):
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = "half_open"
+            self.probe_inflight = False
+        if self.state == "closed":
+            return True
+        if self.state == "half_open" and not self.probe_inflight:
+            self.probe_inflight = True
+            return True
+        self.stats["rejected"] += 1
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        if self.state == "half_open":
+            self.state = "closed"
+            self.probe_inflight = False
+            self.stats["recoveries"] += 1
+            logger.info("Database circuit breaker closed, Mongo is answering again")
+
+    def record_failure(self):
+        self.failures += 1
+        self.stats["failures"] += 1
+        if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self.probe_inflight = False
+            self.stats["trips"] += 1
+            logger.warning(f"Database circuit breaker opened after {self.failures} consecutive failures")
+
+    def release_probe(self):
+        if self.state == "half_open":
+            self.probe_inflight = False
+
+    def snapshot(self):
+        return {
+            **self.stats,
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "open_for_seconds": round(time.monotonic() - self.opened_at, 1) if self.state != "closed" else 0,
+            "failure_threshold": self.failure_threshold,
+            "reset_seconds": self.reset_timeout,
+        }
+
+class StaleResponseCache:
+    """Last-known-good bodies of public GET responses, replayed while Mongo is unavailable."""
+
+    def __init__(self, max_entries, max_age):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def key(request):
+        if request.method != "GET" or request.url.path.startswith("/api/admin/"):
+            return None
+        return f"{request.url.path}?{request.url.query}"
+
+    def store(self, key, response):
+        body = getattr(response, "body", None)
+        if key is None or body is None or response.status_code != 200:
+            return
+        self._entries[key] = (time.monotonic(), body, response.media_type)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def serve(self, key):
+        entry = self._entries.get(key) if key is not None else None
+        if entry is None:
+            return None
+        stored_at, body, media_type = entry
+        age = time.monotonic() - stored_at
+        if age > self.max_age:
+            return None
+        return Response(content=body, media_type=media_type, headers={
+            "Age": str(int(age)),
+            "Warning": '110 - "Response is Stale"',
+            "X-Stale-Response": "true",
+        })
+
+db_breaker = CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS)
+stale_responses = StaleResponseCache(STALE_CACHE_SIZE, STALE_MAX_AGE_SECONDS)
+
+def serve_stale_or_unavailable(stale_key, headers=None):
+    stale = stale_responses.serve(stale_key)
+    if stale is None:
+        raise HTTPException(status_code=503, detail="Banco de dados indisponível no momento", headers=headers)
+    db_breaker.stats["stale_served"] += 1
+    return stale
+
+async def guarded_call(route_handler, request, deadline):
+    stale_key = StaleResponseCache.key(request)
+    if not db_breaker.allow():
+        return serve_stale_or_unavailable(stale_key, {"Retry-After": str(math.ceil(db_breaker.reset_timeout))})
+    try:
+        # Every Mongo call made by the handler shares this budget (sent to the server as maxTimeMS)
+        with pymongo.timeout(deadline):
+            response = await route_handler(request)
+    except ExecutionTimeout:
+        db_breaker.record_success()
+        raise HTTPException(status_code=504, detail="A consulta excedeu o tempo limite")
+    except Exception as e:
+        if not is_db_outage(e):
+            db_breaker.record_success()
+            raise
+        db_breaker.record_failure()
+        logger.error(f"Database error on {request.method} {request.url.path}: {e}")
+        return serve_stale_or_unavailable(stale_key)
+    except BaseException:
+        # Cancelled before the outcome was known; let the next request probe instead
+        db_breaker.release_probe()
+        raise
+    db_breaker.record_success()
+    stale_responses.store(stale_key, response)
+    return response
+
+# ==================== LIFECYCLE ====================
+
+WARMUP_CONNECTIONS = int(os.environ.get('MONGO_WARMUP_CONNECTIONS', str(MONGO_MIN_POOL_SIZE)))
+WARMUP_RETRY_SECONDS = float(os.environ.get('WARMUP_RETRY_SECONDS', '5'))
+SHUTDOWN_DRAIN_SECONDS = float(os.environ.get('SHUTDOWN_DRAIN_SECONDS', '20'))
+
+# Only documents still in the legacy layout carry an `id` field; the partial index shrinks as they are migrated
+LEGACY_ID_INDEX = ([("id", 1)], {"partialFilterExpression": {"id": {"$exists": True}}})
+
+INDEXES = {
+    "categories": [[("slug", 1)], LEGACY_ID_INDEX],
+    "tutorials": [
+        [("slug", 1)],
+        LEGACY_ID_INDEX,
+        [("created_at", -1)],
+        [("category_id", 1), ("created_at", -1)],
+        [("is_featured", 1), ("created_at", -1)],
+        [("rating_avg", -1), ("rating_count", -1)],
+        [("views", -1)],
+    ],
+    "comments": [[("tutorial_id", 1), ("created_at", -1)], LEGACY_ID_INDEX],
+    "blog_posts": [[("slug", 1)], LEGACY_ID_INDEX, [("created_at", -1)]],
+    "faqs": [[("order", 1)], [("category", 1), ("order", 1)], LEGACY_ID_INDEX, [("question", 1)]],
+    "contacts": [[("created_at", -1)], LEGACY_ID_INDEX],
+    "contacts_archive": [[("created_at", -1)]],
+    "engagement_hourly": [
+        ([("tutorial_id", 1), ("hour", 1)], {"unique": True}),
+        ([("hour", 1)], {"expireAfterSeconds": int(os.environ.get('ENGAGEMENT_RETENTION_DAYS', '30')) * 86400}),
+    ],
+}
+
+class Lifecycle:
+    def __init__(self):
+        self.ready = False
+        self.draining = False
+        self.inflight = 0
+        self.background_tasks = set()
+
+lifecycle = Lifecycle()
+
+def start_background_task(coro, name):
+    task = asyncio.create_task(coro, name=name)
+    lifecycle.background_tasks.add(task)
+    task.add_done_callback(lifecycle.background_tasks.discard)
+    return task
+
+async def ensure_indexes():
+    for collection, indexes in INDEXES.items():
+        for spec in indexes:
+            keys, options = spec if isinstance(spec, tuple) else (spec, {})
+            try:
+                await db[collection].create_index(keys, **options)
+            except Exception as e:
+                logger.warning(f"Could not create index {keys} on {collection}: {e}")
+
+async def backfill_rating_avg():
+    await db.tutorials.update_many(
+        {"rating_avg": {"$exists": False}},
+        [{"$set": {"rating_avg": rating_avg_expression()}}]
+    )
+
+async def open_connections():
+    # Concurrent pings each check out their own socket, filling the pool before traffic arrives
+    await asyncio.gather(*[client.admin.command("ping") for _ in range(max(WARMUP_CONNECTIONS, 1))])
+
+async def warm_caches():
+    # Pull the documents behind the home page and listings into the WiredTiger cache
+    await db.categories.find({}).to_list(100)
+    await db.tutorials.find({"is_featured": True}, SUMMARY_PROJECTION).sort("created_at", -1).to_list(6)
+    await db.tutorials.find({}, SUMMARY_PROJECTION).sort("created_at", -1).to_list(50)
+    await db.faqs.find({}).sort("order", 1).to_list(100)
+    await db.blog_posts.find({}, SUMMARY_PROJECTION).sort("created_at", -1).to_list(20)
+    await trending.refresh()
+    await faq_matcher.reload()
+    await autocomplete.reload()
+
+async def warmup():
+    started = time.perf_counter()
+    await open_connections()
+    await ensure_indexes()
+    await backfill_rating_avg()
+    await warm_caches()
+    lifecycle.ready = True
+    logger.info(f"Warmup finished in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+async def warmup_until_ready():
+    while not lifecycle.ready and not lifecycle.draining:
+        try:
+            await warmup()
+        except Exception as e:
+            logger.error(f"Warmup failed, retrying in {WARMUP_RETRY_SECONDS}s: {e}")
+            await asyncio.sleep(WARMUP_RETRY_SECONDS)
+
+async def run_periodically(interval, job, name):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await job()
+        except Exception as e:
+            logger.error(f"Periodic job {name} failed: {e}")
+
+async def drain_requests():
+    deadline = time.monotonic() + SHUTDOWN_DRAIN_SECONDS
+    while lifecycle.inflight > 0 and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    if lifecycle.inflight > 0:
+        logger.warning(f"Shutting down with {lifecycle.inflight} requests still in flight")
+
+@asynccontextmanager
+async def lifespan(app):
+    query_profiler.loop = asyncio.get_running_loop()
+    try:
+        await warmup()
+    except Exception as e:
+        # Keep serving liveness; readiness stays red until Mongo is reachable
+        logger.error(f"Warmup failed: {e}")
+        start_background_task(warmup_until_ready(), "warmup")
+    try:
+        await llm_pool.start()
+    except Exception as e:
+        # The first chat request retries the import
+        logger.error(f"LLM client warmup failed: {e}")
+    ingestion.start()
+    start_background_task(externalize_inline_content(), "externalize-content")
+    if MAINTENANCE_ENABLED:
+        maintenance.start()
+    start_background_task(run_periodically(ENGAGEMENT_FLUSH_SECONDS, engagement.flush, "engagement-flush"), "engagement-flush")
+    start_background_task(run_periodically(TRENDING_REFRESH_SECONDS, trending.refresh, "trending-refresh"), "trending-refresh")
+    start_background_task(run_periodically(AUTOCOMPLETE_REFRESH_SECONDS, autocomplete.reload, "autocomplete-refresh"), "autocomplete-refresh")
+    start_background_task(run_periodically(CHAT_SESSION_PRUNE_SECONDS, chat_sessions.prune, "chat-session-prune"), "chat-session-prune")
+    yield
+    lifecycle.draining = True
+    lifecycle.ready = False
+    await drain_requests()
+    # Before the background tasks are cancelled, so every acknowledged write reaches Mongo
+    await ingestion.close()
+    for task in list(lifecycle.background_tasks):
+        task.cancel()
+    await asyncio.gather(*lifecycle.background_tasks, return_exceptions=True)
+    await engagement.flush()
+    await llm_pool.close()
+    await image_pipeline.fetcher.close()
+    client.close()
+
+class InflightMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        lifecycle.inflight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            lifecycle.inflight -= 1
+
 # Create the main app
-app = FastAPI()
-api_router = APIRouter(prefix="/api")
+app = FastAPI(lifespan=lifespan)
+api_router = APIRouter(prefix="/api", route_class=TimedRoute)
 security = HTTPBasic()
 
 ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', 'admin123')
 
 # ==================== MODELS ====================
 
+# Bayesian prior for rating_avg: every tutorial starts as if it had RATING_PRIOR_WEIGHT votes of RATING_PRIOR_MEAN
+RATING_PRIOR_MEAN = float(os.environ.get('RATING_PRIOR_MEAN', '3.0'))
+RATING_PRIOR_WEIGHT = float(os.environ.get('RATING_PRIOR_WEIGHT', '5'))
+
+def rating_avg_expression():
+    return {"$divide": [
+        {"$add": [RATING_PRIOR_MEAN * RATING_PRIOR_WEIGHT, {"$ifNull": ["$rating_sum", 0]}]},
+        {"$add": [RATING_PRIOR_WEIGHT, {"$ifNull": ["$rating_count", 0]}]}
+    ]}
+
+def rating_update(rating_sum, rating_count):
+    # Pipeline update: the counters and the derived average change in one atomic write
+    return [
+        {"$set": {
+            "rating_sum": {"$add": [{"$ifNull": ["$rating_sum", 0]}, rating_sum]},
+            "rating_count": {"$add": [{"$ifNull": ["$rating_count", 0]}, rating_count]},
+        }},
+        {"$set": {"rating_avg": rating_avg_expression()}}
+    ]
+
 class Category(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -56,7 +784,8 @@ class Tutorial(BaseModel):
     title: str
     slug: str
     description: str
-    content: str
+    # Only detail views load the body from the content store; listings leave it empty
+    content: str = ""
     category_id: str
     tags: List[str] = []
     image_url: str = ""
@@ -65,6 +794,7 @@ class Tutorial(BaseModel):
     views: int = 0
     rating_sum: int = 0
     rating_count: int = 0
+    rating_avg: float = Field(default_factory=lambda: RATING_PRIOR_MEAN)
     is_featured: bool = False
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
     updated_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
@@ -117,7 +847,7 @@ class BlogPost(BaseModel):
     title: str
     slug: str
     excerpt: str
-    content: str
+    content: str = ""
     image_url: str = ""
     tags: List[str] = []
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
@@ -131,6 +861,13 @@ class BlogPostCreate(BaseModel):
     image_url: str = ""
     tags: List[str] = []
 
+class BlogPostUpdate(BaseModel):
+    title: Optional[str] = None
+    excerpt: Optional[str] = None
+    content: Optional[str] = None
+    image_url: Optional[str] = None
+    tags: Optional[List[str]] = None
+
 class FAQ(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -146,6 +883,12 @@ class FAQCreate(BaseModel):
     category: str = "geral"
     order: int = 0
 
+class FAQUpdate(BaseModel):
+    question: Optional[str] = None
+    answer: Optional[str] = None
+    category: Optional[str] = None
+    order: Optional[int] = None
+
 class ContactMessage(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -168,6 +911,216 @@ class ChatMessage(BaseModel):
 class ChatResponse(BaseModel):
     response: str
     session_id: str
+    source: str = "llm"
+    faq_id: Optional[str] = None
+    tutorial_slug: Optional[str] = None
+
+class BulkOperation(BaseModel):
+    op: str
+    collection: str
+    id: Optional[str] = None
+    ids: List[str] = []
+    fields: dict = {}
+    category: Optional[str] = None
+
+class BulkRequest(BaseModel):
+    operations: List[BulkOperation]
+    ordered: bool = True
+    transaction: bool = False
+
+# ==================== STORAGE FORMAT ====================
+
+# Documents are stored compactly: the model `id` becomes a binary UUID `_id`, references to other
+# documents are binary UUIDs and timestamps are native BSON dates. to_storage()/from_storage()
+# translate at the database boundary so the JSON API keeps its string ids and ISO timestamps.
+# While STORAGE_LEGACY_READS is on, lookups also match documents that migrate_compact.py
+# hasn't converted yet.
+STORAGE_LEGACY_READS = os.environ.get('STORAGE_LEGACY_READS', 'true').lower() == 'true'
+REFERENCE_FIELDS = ("category_id", "tutorial_id")
+TIMESTAMP_FIELDS = ("created_at", "updated_at")
+
+def uuid_to_bson(value):
+    try:
+        return Binary.from_uuid(uuid.UUID(value))
+    except (ValueError, TypeError, AttributeError):
+        # Ids that aren't UUIDs (e.g. seed tutorials whose category slug never resolved) stay strings
+        return value
+
+def bson_to_uuid(value):
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, Binary) and value.subtype == UUID_SUBTYPE:
+        return str(value.as_uuid())
+    return value
+
+def to_storage(document):
+    stored = dict(document)
+    if "id" in stored:
+        stored["_id"] = uuid_to_bson(stored.pop("id"))
+    for field in REFERENCE_FIELDS:
+        if field in stored:
+            stored[field] = uuid_to_bson(stored[field])
+    for field in TIMESTAMP_FIELDS:
+        if isinstance(stored.get(field), str):
+            stored[field] = datetime.fromisoformat(stored[field])
+    return stored
+
+def from_storage(document):
+    if document is None:
+        return None
+    public = dict(document)
+    _id = public.pop("_id", None)
+    if "id" not in public and _id is not None and not isinstance(_id, ObjectId):
+        public["id"] = bson_to_uuid(_id)
+    for field in REFERENCE_FIELDS:
+        if field in public:
+            public[field] = bson_to_uuid(public[field])
+    for field in TIMESTAMP_FIELDS:
+        value = public.get(field)
+        if isinstance(value, datetime):
+            public[field] = (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).isoformat()
+    return public
+
+def id_filter(id):
+    if STORAGE_LEGACY_READS:
+        return {"$or": [{"_id": uuid_to_bson(id)}, {"id": id}]}
+    return {"_id": uuid_to_bson(id)}
+
+def ids_filter(ids):
+    ids = list(ids)
+    stored_ids = [uuid_to_bson(id) for id in ids]
+    if STORAGE_LEGACY_READS:
+        return {"$or": [{"_id": {"$in": stored_ids}}, {"id": {"$in": ids}}]}
+    return {"_id": {"$in": stored_ids}}
+
+def reference_filter(value):
+    stored = uuid_to_bson(value)
+    if STORAGE_LEGACY_READS and stored != value:
+        return {"$in": [stored, value]}
+    return stored
+
+# ==================== CONTENT STORE ====================
+
+CONTENT_CACHE_MAX_BYTES = int(os.environ.get('CONTENT_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+CONTENT_ZSTD_LEVEL = int(os.environ.get('CONTENT_ZSTD_LEVEL', '9'))
+CONTENT_MIGRATION_BATCH = int(os.environ.get('CONTENT_MIGRATION_BATCH', '100'))
+CONTENT_COLLECTIONS = ("tutorials", "blog_posts")
+# Listings never need the body; leave both inline (legacy) and out-of-line fields behind
+SUMMARY_PROJECTION = {"content": 0, "content_hash": 0, "content_size": 0, "rating_batches": 0}
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+def compress_content(text):
+    raw = text.encode("utf-8")
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=CONTENT_ZSTD_LEVEL).compress(raw)
+    return "zlib", zlib.compress(raw, 9)
+
+def decompress_content(codec, data):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd-compressed content")
+        return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+    return zlib.decompress(data).decode("utf-8")
+
+class ContentStore:
+    """Markdown bodies stored once per distinct text in the `contents` collection, keyed by SHA-256,
+    so unchanged bodies are shared across revisions and documents. Recently read bodies are kept
+    decompressed in a byte-bounded LRU."""
+
+    def __init__(self, cache_max_bytes):
+        self.cache_max_bytes = cache_max_bytes
+        self._cache = OrderedDict()
+        self._cache_bytes = 0
+
+    def _remember(self, content_hash, text):
+        if content_hash in self._cache:
+            self._cache.move_to_end(content_hash)
+            return
+        self._cache[content_hash] = text
+        self._cache_bytes += len(text)
+        while self._cache_bytes > self.cache_max_bytes and self._cache:
+            _, evicted = self._cache.popitem(last=False)
+            self._cache_bytes -= len(evicted)
+
+    async def put_many(self, texts):
+        """Store bodies that aren't stored yet; returns {text: (hash, size)}."""
+        refs = {text: (hashlib.sha256(text.encode("utf-8")).hexdigest(), len(text)) for text in set(texts)}
+        if not refs:
+            return refs
+        known = await db.contents.find(
+            {"_id": {"$in": [content_hash for content_hash, _ in refs.values()]}}, {"_id": 1}
+        ).to_list(None)
+        known = {doc["_id"] for doc in known}
+        missing = [(text, ref) for text, ref in refs.items() if ref[0] not in known]
+        if missing:
+            compressed = await asyncio.to_thread(lambda: [compress_content(text) for text, _ in missing])
+            now = datetime.now(timezone.utc)
+            await db.contents.bulk_write([
+                UpdateOne(
+                    {"_id": content_hash},
+                    {"$setOnInsert": {"codec": codec, "size": size, "data": Binary(data), "created_at": now}},
+                    upsert=True
+                )
+                for (_, (content_hash, size)), (codec, data) in zip(missing, compressed)
+            ], ordered=False)
+        return refs
+
+    async def get(self, content_hash):
+        text = self._cache.get(content_hash)
+        if text is not None:
+            self._cache.move_to_end(content_hash)
+            return text
+        doc = await db.contents.find_one({"_id": content_hash})
+        if doc is None:
+            return ""
+        text = await asyncio.to_thread(decompress_content, doc["codec"], doc["data"])
+        self._remember(content_hash, text)
+        return text
+
+    async def externalize(self, documents):
+        """Move `content` out of stored documents (in place), leaving content_hash/content_size."""
+        documents = [doc for doc in documents if isinstance(doc.get("content"), str)]
+        refs = await self.put_many([doc["content"] for doc in documents])
+        for doc in documents:
+            doc["content_hash"], doc["content_size"] = refs[doc.pop("content")]
+
+    async def load(self, document):
+        """Put the body back into a stored document read for a detail view."""
+        if document is None:
+            return None
+        content_hash = document.pop("content_hash", None)
+        document.pop("content_size", None)
+        if "content" not in document:
+            document["content"] = await self.get(content_hash) if content_hash else ""
+        return document
+
+content_store = ContentStore(CONTENT_CACHE_MAX_BYTES)
+
+async def externalize_inline_content():
+    """Background migration of documents written before the content store existed."""
+    for collection in CONTENT_COLLECTIONS:
+        while True:
+            docs = await db[collection].find(
+                {"content": {"$exists": True}}, {"content": 1}
+            ).limit(CONTENT_MIGRATION_BATCH).to_list(CONTENT_MIGRATION_BATCH)
+            if not docs:
+                break
+            originals = [doc["content"] for doc in docs]
+            await content_store.externalize(docs)
+            # Matching on the old body skips documents an admin edited in the meantime
+            await db[collection].bulk_write([
+                UpdateOne(
+                    {"_id": doc["_id"], "content": original},
+                    {"$set": {"content_hash": doc["content_hash"], "content_size": doc["content_size"]},
+                     "$unset": {"content": ""}}
+                )
+                for doc, original in zip(docs, originals)
+            ], ordered=False)
+            await asyncio.sleep(0.05)
 
 # ==================== ADMIN AUTH ====================
 
@@ -177,40 +1130,237 @@ def verify_admin(credentials: HTTPBasicCredentials = Depends(security)):
         raise HTTPException(status_code=401, detail="Credenciais inválidas")
     return credentials.username
 
+# ==================== RATE LIMITING ====================
+
+# Networks our proxies connect from. The deployment ingress reaches the app over the cluster's private
+# network, so by default X-Forwarded-For is honoured only when the peer is a private address; set to ""
+# to key on the peer address alone when the app is exposed directly
+RATE_LIMIT_TRUSTED_PROXIES = [
+    ipaddress.ip_network(network.strip())
+    for network in os.environ.get(
+        'RATE_LIMIT_TRUSTED_PROXIES', '127.0.0.0/8,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16,::1/128,fc00::/7'
+    ).split(',')
+    if network.strip()
+]
+RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS', '100000'))
+
+def parse_rate_limit(name, default):
+    # "<burst>/<seconds>": burst requests allowed, refilled evenly over the period
+    burst, seconds = os.environ.get(f'RATE_LIMIT_{name.upper()}', default).split('/')
+    return int(burst), float(seconds)
+
+RATE_LIMITS = {
+    "comments": parse_rate_limit("comments", "5/60"),
+    "contact": parse_rate_limit("contact", "3/300"),
+    "rate": parse_rate_limit("rate", "10/60"),
+    "chat": parse_rate_limit("chat", "10/60"),
+}
+
+class InMemoryRateLimitStore:
+    """Token buckets for a single worker. Idle keys are evicted in LRU order once max_keys is reached;
+    an evicted bucket would have refilled anyway, so eviction never lets a client exceed its limit
+    unless the store is saturated. A shared store (e.g. Redis) only needs to implement take()."""
+
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+
+    async def take(self, key, capacity, refill_per_second, cost=1):
+        """Consume cost tokens; returns 0 when allowed, otherwise the seconds until enough tokens refill."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * refill_per_second)
+        if tokens >= cost:
+            tokens -= cost
+            retry_after = 0.0
+        else:
+            retry_after = (cost - tokens) / refill_per_second
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+    def __len__(self):
+        return len(self._buckets)
+
+rate_limit_store = InMemoryRateLimitStore(RATE_LIMIT_MAX_KEYS)
+
+def is_trusted_proxy(host):
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in RATE_LIMIT_TRUSTED_PROXIES)
+
+def client_ip(request: Request):
+    host = request.client.host if request.client else "unknown"
+    if not is_trusted_proxy(host):
+        return host
+    # Walk back from the entry our proxy appended; the first address that isn't one of our proxies is the
+    # client. Anything further left was written by the client itself and can't be trusted
+    forwarded = [entry.strip() for entry in request.headers.get("x-forwarded-for", "").split(",") if entry.strip()]
+    for entry in reversed(forwarded):
+        if not is_trusted_proxy(entry):
+            return entry
+        host = entry
+    return host
+
+def rate_limit(route):
+    burst, seconds = RATE_LIMITS[route]
+
+    async def check_rate_limit(request: Request):
+        retry_after = await rate_limit_store.take(f"{route}:{client_ip(request)}", burst, burst / seconds)
+        if retry_after > 0:
+            raise HTTPException(
+                status_code=429,
+                detail="Muitas requisições, tente novamente em instantes",
+                headers={"Retry-After": str(math.ceil(retry_after))}
+            )
+
+    return check_rate_limit
+
+@api_router.get("/admin/rate-limits")
+async def get_rate_limits(request: Request, admin: str = Depends(verify_admin)):
+    return {
+        "client_ip": client_ip(request),
+        "limits": {route: {"burst": burst, "seconds": seconds} for route, (burst, seconds) in RATE_LIMITS.items()},
+        "tracked_keys": len(rate_limit_store),
+    }
+
 # ==================== CATEGORY ROUTES ====================
 
 @api_router.get("/categories", response_model=List[Category])
 async def get_categories():
-    categories = await db.categories.find({}, {"_id": 0}).to_list(100)
-    return categories
+    categories = await db.categories.find({}).to_list(100)
+    return [from_storage(c) for c in categories]
 
 @api_router.get("/categories/{slug}")
 async def get_category(slug: str):
-    category = await db.categories.find_one({"slug": slug}, {"_id": 0})
+    category = await db.categories.find_one({"slug": slug})
     if not category:
         raise HTTPException(status_code=404, detail="Categoria não encontrada")
-    return category
+    return from_storage(category)
 
 @api_router.post("/admin/categories", response_model=Category)
 async def create_category(data: CategoryCreate, admin: str = Depends(verify_admin)):
     category = Category(**data.model_dump())
-    await db.categories.insert_one(category.model_dump())
+    await db.categories.insert_one(to_storage(category.model_dump()))
+    faq_matcher.category_ids[category.slug] = category.id
+    autocomplete.upsert_category(category.model_dump())
     return category
 
 @api_router.delete("/admin/categories/{id}")
 async def delete_category(id: str, admin: str = Depends(verify_admin)):
-    result = await db.categories.delete_one({"id": id})
+    result = await db.categories.delete_one(id_filter(id))
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Categoria não encontrada")
+    autocomplete.remove(("category", id))
+    maintenance.trigger("orphan-tutorials")
     return {"message": "Categoria excluída"}
 
+# ==================== ENGAGEMENT ====================
+
+ENGAGEMENT_FLUSH_SECONDS = float(os.environ.get('ENGAGEMENT_FLUSH_SECONDS', '10'))
+ENGAGEMENT_FLUSH_BATCH = int(os.environ.get('ENGAGEMENT_FLUSH_BATCH', '500'))
+TRENDING_WINDOW_HOURS = int(os.environ.get('TRENDING_WINDOW_HOURS', '168'))
+TRENDING_HALF_LIFE_HOURS = float(os.environ.get('TRENDING_HALF_LIFE_HOURS', '24'))
+TRENDING_REFRESH_SECONDS = float(os.environ.get('TRENDING_REFRESH_SECONDS', '60'))
+TRENDING_SIZE = int(os.environ.get('TRENDING_SIZE', '50'))
+# A 5-star rating weighs as much as this many views
+TRENDING_RATING_WEIGHT = float(os.environ.get('TRENDING_RATING_WEIGHT', '5'))
+
+def current_hour():
+    return datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+class EngagementRecorder:
+    """Counts views and ratings per tutorial and hour in memory and flushes them as $inc upserts into engagement_hourly."""
+
+    def __init__(self):
+        self._buckets = {}
+
+    def _bucket(self, tutorial_id):
+        key = (tutorial_id, current_hour())
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = {"views": 0, "ratings": 0, "rating_sum": 0}
+        return bucket
+
+    def record_view(self, tutorial_id):
+        self._bucket(tutorial_id)["views"] += 1
+
+    def record_rating(self, tutorial_id, rating):
+        bucket = self._bucket(tutorial_id)
+        bucket["ratings"] += 1
+        bucket["rating_sum"] += rating
+
+    def _merge(self, buckets):
+        for key, counts in buckets.items():
+            bucket = self._buckets.setdefault(key, {"views": 0, "ratings": 0, "rating_sum": 0})
+            for field, value in counts.items():
+                bucket[field] += value
+
+    async def flush(self):
+        if not self._buckets:
+            return
+        buckets, self._buckets = self._buckets, {}
+        items = list(buckets.items())
+        for start in range(0, len(items), ENGAGEMENT_FLUSH_BATCH):
+            batch = items[start:start + ENGAGEMENT_FLUSH_BATCH]
+            operations = [
+                UpdateOne({"tutorial_id": uuid_to_bson(tutorial_id), "hour": hour}, {"$inc": counts}, upsert=True)
+                for (tutorial_id, hour), counts in batch
+            ]
+            try:
+                await db.engagement_hourly.bulk_write(operations, ordered=False)
+            except Exception:
+                # Keep the unwritten counts for the next flush instead of dropping them
+                self._merge(dict(items[start:]))
+                raise
+
+class TrendingRanking:
+    """Ranking recomputed in the background from hourly rollups, with exponential time decay."""
+
+    def __init__(self):
+        self.tutorials = []
+        self.refreshed_at = None
+
+    async def refresh(self):
+        now = datetime.now(timezone.utc)
+        since = current_hour() - timedelta(hours=TRENDING_WINDOW_HOURS)
+        scores = {}
+        cursor = db.engagement_hourly.find({"hour": {"$gte": since}}, {"_id": 0})
+        async for rollup in cursor:
+            hour = rollup["hour"]
+            if hour.tzinfo is None:
+                hour = hour.replace(tzinfo=timezone.utc)
+            age_hours = max((now - hour).total_seconds() / 3600, 0)
+            activity = rollup.get("views", 0) + TRENDING_RATING_WEIGHT * rollup.get("rating_sum", 0) / 5
+            decay = 0.5 ** (age_hours / TRENDING_HALF_LIFE_HOURS)
+            tutorial_id = bson_to_uuid(rollup["tutorial_id"])
+            scores[tutorial_id] = scores.get(tutorial_id, 0) + activity * decay
+        top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:TRENDING_SIZE]
+        docs = await db.tutorials.find(
+            ids_filter(tutorial_id for tutorial_id, _ in top), SUMMARY_PROJECTION
+        ).to_list(TRENDING_SIZE)
+        by_id = {doc["id"]: doc for doc in map(from_storage, docs)}
+        ranking = []
+        for tutorial_id, score in top:
+            if tutorial_id in by_id:
+                ranking.append({**by_id[tutorial_id], "trending_score": round(score, 3)})
+        self.tutorials = ranking
+        self.refreshed_at = now
+
+engagement = EngagementRecorder()
+trending = TrendingRanking()
+
 # ==================== TUTORIAL ROUTES ====================
 
 @api_router.get("/tutorials", response_model=List[Tutorial])
 async def get_tutorials(category: Optional[str] = None, featured: Optional[bool] = None, search: Optional[str] = None, limit: int = 50):
     query = {}
     if category:
-        query["category_id"] = category
+        query["category_id"] = reference_filter(category)
     if featured is not None:
         query["is_featured"] = featured
     if search:
@@ -219,72 +1369,350 @@ async def get_tutorials(category: Optional[str] = None, featured: Optional[bool]
             {"description": {"$regex": search, "$options": "i"}},
             {"tags": {"$regex": search, "$options": "i"}}
         ]
-    tutorials = await db.tutorials.find(query, {"_id": 0}).sort("created_at", -1).to_list(limit)
-    return tutorials
+    tutorials = await db.tutorials.find(query, SUMMARY_PROJECTION).sort("created_at", -1).to_list(limit)
+    return [from_storage(t) for t in tutorials]
+
+@api_router.get("/tutorials/trending")
+async def get_trending_tutorials(limit: int = 10):
+    return trending.tutorials[:limit]
 
 @api_router.get("/tutorials/{slug}")
 async def get_tutorial(slug: str):
-    tutorial = await db.tutorials.find_one({"slug": slug}, {"_id": 0})
+    tutorial = from_storage(await content_store.load(await db.tutorials.find_one({"slug": slug}, {"rating_batches": 0})))
     if not tutorial:
         raise HTTPException(status_code=404, detail="Tutorial não encontrado")
     # Increment views
     await db.tutorials.update_one({"slug": slug}, {"$inc": {"views": 1}})
     tutorial["views"] = tutorial.get("views", 0) + 1
+    engagement.record_view(tutorial["id"])
     return tutorial
 
 @api_router.post("/admin/tutorials", response_model=Tutorial)
 async def create_tutorial(data: TutorialCreate, admin: str = Depends(verify_admin)):
     tutorial = Tutorial(**data.model_dump())
-    await db.tutorials.insert_one(tutorial.model_dump())
+    stored = to_storage(tutorial.model_dump())
+    await content_store.externalize([stored])
+    await db.tutorials.insert_one(stored)
+    faq_matcher.upsert_tutorial(tutorial.model_dump())
+    autocomplete.upsert_tutorial(tutorial.model_dump())
     return tutorial
 
 @api_router.put("/admin/tutorials/{id}", response_model=Tutorial)
 async def update_tutorial(id: str, data: TutorialUpdate, admin: str = Depends(verify_admin)):
     update_data = {k: v for k, v in data.model_dump().items() if v is not None}
     update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
-    result = await db.tutorials.update_one({"id": id}, {"$set": update_data})
-    if result.matched_count == 0:
+    update = await storage_update(update_data)
+    # One round trip: the write returns the document as it is after the update
+    tutorial = await db.tutorials.find_one_and_update(id_filter(id), update, return_document=ReturnDocument.AFTER)
+    if tutorial is None:
         raise HTTPException(status_code=404, detail="Tutorial não encontrado")
-    tutorial = await db.tutorials.find_one({"id": id}, {"_id": 0})
+    tutorial = from_storage(await content_store.load(tutorial))
+    faq_matcher.upsert_tutorial(tutorial)
+    autocomplete.upsert_tutorial(tutorial)
     return tutorial
 
 @api_router.delete("/admin/tutorials/{id}")
 async def delete_tutorial(id: str, admin: str = Depends(verify_admin)):
-    result = await db.tutorials.delete_one({"id": id})
+    result = await db.tutorials.delete_one(id_filter(id))
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Tutorial não encontrado")
+    faq_matcher.remove_tutorial(id)
+    autocomplete.remove(("tutorial", id))
+    maintenance.trigger("orphan-comments")
     return {"message": "Tutorial excluído"}
 
+# ==================== WRITE INGESTION ====================
+
+# immediate: one write per request, as before
+# group: requests wait until the batch holding their write is committed (acknowledged writes, fewer round trips)
+# batched: requests are acknowledged once queued; the batch is written within INGEST_LINGER_MS
+INGEST_MODES = ("immediate", "group", "batched")
+INGEST_DURABILITY = os.environ.get('INGEST_DURABILITY', 'group')
+INGEST_BATCH_SIZE = int(os.environ.get('INGEST_BATCH_SIZE', '200'))
+INGEST_LINGER_MS = float(os.environ.get('INGEST_LINGER_MS', '50'))
+INGEST_QUEUE_MAX = int(os.environ.get('INGEST_QUEUE_MAX', '10000'))
+INGEST_ENQUEUE_TIMEOUT_SECONDS = float(os.environ.get('INGEST_ENQUEUE_TIMEOUT_SECONDS', '1'))
+INGEST_MAX_ATTEMPTS = int(os.environ.get('INGEST_MAX_ATTEMPTS', '3'))
+# How long a group-mode request waits for its batch to commit; matches the public routes' DB deadline
+INGEST_WAIT_SECONDS = float(os.environ.get('INGEST_WAIT_SECONDS', str(DB_DEADLINE_SECONDS)))
+# Recent batch ids kept on each tutorial so a retried rating batch isn't applied twice
+INGEST_RATING_BATCH_HISTORY = int(os.environ.get('INGEST_RATING_BATCH_HISTORY', '32'))
+
+class IngestQueueFull(Exception):
+    pass
+
+class IngestTimeout(Exception):
+    pass
+
+class WriteStream:
+    """Coalesces single-document writes of one kind into bulk writes, by batch size or linger time.
+
+    The queue is bounded: when the writer falls behind, submitters wait up to
+    INGEST_ENQUEUE_TIMEOUT_SECONDS for room and are then turned away with IngestQueueFull.
+
+    Batches that fail with an outage error are retried, so write_batch must be idempotent.
+    The optional resolve(items) runs once after a batch is written, outside the retries, and
+    returns one result per item for its group-mode submitter."""
+
+    def __init__(self, name, write_batch, mode, resolve=None):
+        if mode not in INGEST_MODES:
+            raise RuntimeError(f"Unknown durability mode '{mode}' for {name}, expected one of {INGEST_MODES}")
+        self.name = name
+        self.write_batch = write_batch
+        self.resolve = resolve
+        self.mode = mode
+        self._queue = None
+        self._writer = None
+        self.stats = {"queued": 0, "written": 0, "batches": 0, "rejected": 0, "failed": 0}
+
+    def start(self):
+        if self.mode == "immediate":
+            return
+        # Created here rather than in __init__ so the queue belongs to the serving event loop
+        self._queue = asyncio.Queue(maxsize=INGEST_QUEUE_MAX)
+        self._writer = asyncio.create_task(self._run(), name=f"ingest-{self.name}")
+
+    async def submit(self, item):
+        if self._writer is None:
+            await self.write_batch([item])
+            self.stats["written"] += 1
+            return (await self._resolve([item]))[0]
+        done = asyncio.get_running_loop().create_future() if self.mode == "group" else None
+        try:
+            await asyncio.wait_for(self._queue.put((item, done)), INGEST_ENQUEUE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            self.stats["rejected"] += 1
+            raise IngestQueueFull(self.name)
+        self.stats["queued"] += 1
+        if done is not None:
+            # Outage retries can outlast the request; the batch still commits if it recovers
+            try:
+                return await asyncio.wait_for(done, INGEST_WAIT_SECONDS)
+            except asyncio.TimeoutError:
+                raise IngestTimeout(self.name)
+
+    async def _next_batch(self):
+        loop = asyncio.get_running_loop()
+        entry = await self._queue.get()
+        if entry is None:
+            return [], True
+        batch = [entry]
+        deadline = loop.time() + INGEST_LINGER_MS / 1000
+        while len(batch) < INGEST_BATCH_SIZE:
+            try:
+                entry = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    entry = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            if entry is None:
+                return batch, True
+            batch.append(entry)
+        return batch, False
+
+    async def _run(self):
+        while True:
+            batch, closing = await self._next_batch()
+            if batch:
+                await self._write(batch)
+            if closing:
+                return
+
+    async def _write(self, batch):
+        items = [item for item, _ in batch]
+        for attempt in range(1, INGEST_MAX_ATTEMPTS + 1):
+            try:
+                await self.write_batch(items)
+                break
+            except Exception as e:
+                if attempt < INGEST_MAX_ATTEMPTS and is_db_outage(e):
+                    await asyncio.sleep(0.1 * 2 ** attempt)
+                    continue
+                self.stats["failed"] += len(items)
+                logger.error(f"Ingestion batch of {len(items)} {self.name} failed: {e}")
+                for _, done in batch:
+                    if done is not None and not done.done():
+                        done.set_exception(e)
+                return
+        self.stats["written"] += len(items)
+        self.stats["batches"] += 1
+        results = await self._resolve(items)
+        for (_, done), result in zip(batch, results):
+            if done is not None and not done.done():
+                done.set_result(result)
+
+    async def _resolve(self, items):
+        if self.resolve is None:
+            return [None] * len(items)
+        try:
+            return await self.resolve(items)
+        except Exception as e:
+            # The batch is already written; only the per-item answers are lost
+            logger.error(f"Resolving {len(items)} written {self.name} failed: {e}")
+            return [None] * len(items)
+
+    async def close(self):
+        if self._writer is None:
+            return
+        # The sentinel queues behind everything already accepted, so the writer drains it all first
+        await self._queue.put(None)
+        await self._writer
+        self._writer = None
+
+    def snapshot(self):
+        return {
+            **self.stats,
+            "mode": self.mode,
+            "queue_depth": self._queue.qsize() if self._writer is not None else 0,
+        }
+
+async def insert_documents(collection, documents):
+    try:
+        await collection.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        # A retried batch may have been partly written already; those documents are duplicates of themselves
+        if e.details.get("writeConcernErrors") or any(err["code"] != 11000 for err in e.details["writeErrors"]):
+            raise
+
+async def write_comments(comments):
+    await insert_documents(db.comments, [to_storage(comment) for comment in comments])
+
+async def write_contacts(contacts):
+    await insert_documents(db.contacts, [to_storage(contact) for contact in contacts])
+
+async def write_ratings(ratings):
+    totals = {}
+    for _, slug, rating in ratings:
+        rating_sum, rating_count = totals.get(slug, (0, 0))
+        totals[slug] = (rating_sum + rating, rating_count + 1)
+    # Every vote is in exactly one batch, so its first vote id names the batch across retries. Tutorials
+    # remember the last few batch ids they absorbed, and a retry skips the ones it already reached
+    batch_id = ratings[0][0]
+    remember_batch = {"$set": {"rating_batches": {"$slice": [
+        {"$concatArrays": [{"$ifNull": ["$rating_batches", []]}, [batch_id]]}, -INGEST_RATING_BATCH_HISTORY,
+    ]}}}
+    # A burst of votes on one tutorial becomes a single update; votes for unknown slugs match nothing
+    await db.tutorials.bulk_write(
+        [
+            UpdateOne({"slug": slug, "rating_batches": {"$ne": batch_id}}, rating_update(*counts) + [remember_batch])
+            for slug, counts in totals.items()
+        ],
+        ordered=False,
+    )
+
+async def resolve_ratings(ratings):
+    # Engagement is keyed by id, resolved once per batch rather than once per vote in the route
+    slugs = list({slug for _, slug, _ in ratings})
+    cursor = db.tutorials.find({"slug": {"$in": slugs}}, {"id": 1, "slug": 1})
+    ids = {tutorial["slug"]: tutorial["id"] for tutorial in map(from_storage, await cursor.to_list(len(slugs)))}
+    for _, slug, rating in ratings:
+        if slug in ids:
+            engagement.record_rating(ids[slug], rating)
+    return [slug in ids for _, slug, _ in ratings]
+
+def ingest_mode(name):
+    return os.environ.get(f'INGEST_DURABILITY_{name.upper()}', INGEST_DURABILITY)
+
+class WriteIngestion:
+    def __init__(self):
+        self.comments = WriteStream("comments", write_comments, ingest_mode("comments"))
+        self.contacts = WriteStream("contacts", write_contacts, ingest_mode("contacts"))
+        self.ratings = WriteStream("ratings", write_ratings, ingest_mode("ratings"), resolve_ratings)
+        self.streams = [self.comments, self.contacts, self.ratings]
+
+    def start(self):
+        for stream in self.streams:
+            stream.start()
+
+    async def close(self):
+        await asyncio.gather(*(stream.close() for stream in self.streams))
+
+    def snapshot(self):
+        return {stream.name: stream.snapshot() for stream in self.streams}
+
+ingestion = WriteIngestion()
+
+async def ingest(stream, item):
+    try:
+        return await stream.submit(item)
+    except IngestQueueFull:
+        raise HTTPException(
+            status_code=503, detail="Muitas requisições no momento, tente novamente",
+            headers={"Retry-After": "1"},
+        )
+    except IngestTimeout:
+        raise HTTPException(status_code=504, detail="A gravação excedeu o tempo limite")
+
+@api_router.get("/admin/ingestion")
+async def get_ingestion_stats(admin: str = Depends(verify_admin)):
+    return {
+        "batch_size": INGEST_BATCH_SIZE,
+        "linger_ms": INGEST_LINGER_MS,
+        "queue_max": INGEST_QUEUE_MAX,
+        "streams": ingestion.snapshot(),
+    }
+
 # ==================== RATING ROUTE ====================
 
-@api_router.post("/tutorials/{slug}/rate")
+@api_router.post("/tutorials/{slug}/rate", dependencies=[Depends(rate_limit("rate"))])
 async def rate_tutorial(slug: str, rating: Rating):
     if rating.rating < 1 or rating.rating > 5:
         raise HTTPException(status_code=400, detail="Rating deve ser entre 1 e 5")
-    result = await db.tutorials.update_one(
-        {"slug": slug},
-        {"$inc": {"rating_sum": rating.rating, "rating_count": 1}}
-    )
-    if result.matched_count == 0:
+    if ingestion.ratings.mode != "immediate":
+        # Queued by slug so the route makes no round trip of its own. Group mode learns from the
+        # writer whether the slug exists; batched mode answers before the write and can't tell
+        found = await ingest(ingestion.ratings, (str(uuid.uuid4()), slug, rating.rating))
+        if found is False:
+            raise HTTPException(status_code=404, detail="Tutorial não encontrado")
+        return {"message": "Avaliação registrada"}
+    tutorial = from_storage(await db.tutorials.find_one_and_update(
+        {"slug": slug}, rating_update(rating.rating, 1), projection={"id": 1}
+    ))
+    if not tutorial:
         raise HTTPException(status_code=404, detail="Tutorial não encontrado")
+    engagement.record_rating(tutorial["id"], rating.rating)
     return {"message": "Avaliação registrada"}
 
+# ==================== LEADERBOARD ROUTES ====================
+
+LEADERBOARD_MAX_LIMIT = 100
+LEADERBOARD_PROJECTION = SUMMARY_PROJECTION
+
+@api_router.get("/leaderboards/top-rated")
+async def get_top_rated(limit: int = 10):
+    # Served straight off the {rating_avg, rating_count} index: reads only `limit` entries
+    limit = max(1, min(limit, LEADERBOARD_MAX_LIMIT))
+    tutorials = await db.tutorials.find({}, LEADERBOARD_PROJECTION).sort(
+        [("rating_avg", -1), ("rating_count", -1)]
+    ).limit(limit).to_list(limit)
+    return [from_storage(t) for t in tutorials]
+
+@api_router.get("/leaderboards/most-viewed")
+async def get_most_viewed(limit: int = 10):
+    limit = max(1, min(limit, LEADERBOARD_MAX_LIMIT))
+    tutorials = await db.tutorials.find({}, LEADERBOARD_PROJECTION).sort("views", -1).limit(limit).to_list(limit)
+    return [from_storage(t) for t in tutorials]
+
 # ==================== COMMENT ROUTES ====================
 
 @api_router.get("/tutorials/{tutorial_id}/comments", response_model=List[Comment])
 async def get_comments(tutorial_id: str):
-    comments = await db.comments.find({"tutorial_id": tutorial_id}, {"_id": 0}).sort("created_at", -1).to_list(100)
-    return comments
+    comments = await db.comments.find({"tutorial_id": reference_filter(tutorial_id)}).sort("created_at", -1).to_list(100)
+    return [from_storage(c) for c in comments]
 
-@api_router.post("/comments", response_model=Comment)
+@api_router.post("/comments", response_model=Comment, dependencies=[Depends(rate_limit("comments"))])
 async def create_comment(data: CommentCreate):
     comment = Comment(**data.model_dump())
-    await db.comments.insert_one(comment.model_dump())
+    await ingest(ingestion.comments, comment.model_dump())
     return comment
 
 @api_router.delete("/admin/comments/{id}")
 async def delete_comment(id: str, admin: str = Depends(verify_admin)):
-    result = await db.comments.delete_one({"id": id})
+    result = await db.comments.delete_one(id_filter(id))
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Comentário não encontrado")
     return {"message": "Comentário excluído"}
@@ -293,27 +1721,31 @@ async def delete_comment(id: str, admin: str = Depends(verify_admin)):
 
 @api_router.get("/blog", response_model=List[BlogPost])
 async def get_blog_posts(limit: int = 20):
-    posts = await db.blog_posts.find({}, {"_id": 0}).sort("created_at", -1).to_list(limit)
-    return posts
+    posts = await db.blog_posts.find({}, SUMMARY_PROJECTION).sort("created_at", -1).to_list(limit)
+    return [from_storage(p) for p in posts]
 
 @api_router.get("/blog/{slug}")
 async def get_blog_post(slug: str):
-    post = await db.blog_posts.find_one({"slug": slug}, {"_id": 0})
+    post = await db.blog_posts.find_one({"slug": slug})
     if not post:
         raise HTTPException(status_code=404, detail="Post não encontrado")
-    return post
+    return from_storage(await content_store.load(post))
 
 @api_router.post("/admin/blog", response_model=BlogPost)
 async def create_blog_post(data: BlogPostCreate, admin: str = Depends(verify_admin)):
     post = BlogPost(**data.model_dump())
-    await db.blog_posts.insert_one(post.model_dump())
+    stored = to_storage(post.model_dump())
+    await content_store.externalize([stored])
+    await db.blog_posts.insert_one(stored)
+    autocomplete.upsert_blog_post(post.model_dump())
     return post
 
 @api_router.delete("/admin/blog/{id}")
 async def delete_blog_post(id: str, admin: str = Depends(verify_admin)):
-    result = await db.blog_posts.delete_one({"id": id})
+    result = await db.blog_posts.delete_one(id_filter(id))
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Post não encontrado")
+    autocomplete.remove(("blog", id))
     return {"message": "Post excluído"}
 
 # ==================== FAQ ROUTES ====================
@@ -321,46 +1753,764 @@ async def delete_blog_post(id: str, admin: str = Depends(verify_admin)):
 @api_router.get("/faqs", response_model=List[FAQ])
 async def get_faqs(category: Optional[str] = None):
     query = {"category": category} if category else {}
-    faqs = await db.faqs.find(query, {"_id": 0}).sort("order", 1).to_list(100)
-    return faqs
+    faqs = await db.faqs.find(query).sort("order", 1).to_list(100)
+    return [from_storage(f) for f in faqs]
 
 @api_router.post("/admin/faqs", response_model=FAQ)
 async def create_faq(data: FAQCreate, admin: str = Depends(verify_admin)):
     faq = FAQ(**data.model_dump())
-    await db.faqs.insert_one(faq.model_dump())
+    await db.faqs.insert_one(to_storage(faq.model_dump()))
+    faq_matcher.add_faq(faq.model_dump())
     return faq
 
 @api_router.delete("/admin/faqs/{id}")
 async def delete_faq(id: str, admin: str = Depends(verify_admin)):
-    result = await db.faqs.delete_one({"id": id})
+    result = await db.faqs.delete_one(id_filter(id))
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="FAQ não encontrado")
+    faq_matcher.remove_faq(id)
     return {"message": "FAQ excluído"}
 
 # ==================== CONTACT ROUTES ====================
 
-@api_router.post("/contact", response_model=ContactMessage)
+@api_router.post("/contact", response_model=ContactMessage, dependencies=[Depends(rate_limit("contact"))])
 async def create_contact(data: ContactCreate):
     contact = ContactMessage(**data.model_dump())
-    await db.contacts.insert_one(contact.model_dump())
+    await ingest(ingestion.contacts, contact.model_dump())
     return contact
 
 @api_router.get("/admin/contacts", response_model=List[ContactMessage])
 async def get_contacts(admin: str = Depends(verify_admin)):
-    contacts = await db.contacts.find({}, {"_id": 0}).sort("created_at", -1).to_list(100)
-    return contacts
+    contacts = await db.contacts.find({}).sort("created_at", -1).to_list(100)
+    return [from_storage(c) for c in contacts]
+
+# ==================== BULK ADMIN ====================
+
+BULK_MAX_OPERATIONS = int(os.environ.get('BULK_MAX_OPERATIONS', '1000'))
+
+# name used in requests -> (collection, update model, field set by recategorize, has an `order` field)
+BULK_COLLECTIONS = {
+    "tutorials": ("tutorials", TutorialUpdate, "category_id", False),
+    "blog": ("blog_posts", BlogPostUpdate, None, False),
+    "faqs": ("faqs", FAQUpdate, "category", True),
+    "comments": ("comments", None, None, False),
+}
+TIMESTAMPED_COLLECTIONS = {"tutorials", "blog_posts"}
+
+async def storage_update(fields):
+    """$set (and $unset of inline content) for a partial update, with any new body moved to the content store."""
+    update = {"$set": to_storage(fields)}
+    if "content" in fields:
+        await content_store.externalize([update["$set"]])
+        update["$unset"] = {"content": ""}
+    return update
+
+class BulkPlan:
+    """Turns admin operations into bulk_write requests, grouping consecutive operations on the same collection."""
+
+    def __init__(self):
+        self.groups = []
+        self.category_ids = None
+
+    def add(self, collection, requests):
+        if self.groups and self.groups[-1][0] == collection:
+            self.groups[-1][1].extend(requests)
+        else:
+            self.groups.append((collection, list(requests)))
+
+    async def resolve_category(self, value):
+        if self.category_ids is None:
+            self.category_ids = {}
+            async for cat in db.categories.find({}, {"slug": 1}):
+                cat = from_storage(cat)
+                self.category_ids[cat["id"]] = cat["id"]
+                self.category_ids[cat["slug"]] = cat["id"]
+        return self.category_ids.get(value)
+
+    async def add_operation(self, op):
+        spec = BULK_COLLECTIONS.get(op.collection)
+        if spec is None:
+            raise ValueError(f"coleção inválida: {op.collection}")
+        collection, update_model, category_field, has_order = spec
+        ids = op.ids or ([op.id] if op.id else [])
+        if not ids:
+            raise ValueError("informe id ou ids")
+        many = len(ids) > 1
+        target = ids_filter(ids) if many else id_filter(ids[0])
+        now = datetime.now(timezone.utc).isoformat()
+
+        if op.op == "update":
+            if update_model is None:
+                raise ValueError(f"{op.collection} não aceita update")
+            try:
+                fields = update_model.model_validate(op.fields).model_dump(exclude_none=True)
+            except ValidationError as e:
+                raise ValueError("; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+            if not fields:
+                raise ValueError("nenhum campo para atualizar")
+            if collection in TIMESTAMPED_COLLECTIONS:
+                fields["updated_at"] = now
+            update = await storage_update(fields)
+            self.add(collection, [UpdateMany(target, update) if many else UpdateOne(target, update)])
+        elif op.op == "delete":
+            self.add(collection, [DeleteMany(target)])
+        elif op.op == "reorder":
+            if not has_order:
+                raise ValueError(f"{op.collection} não tem ordem")
+            self.add(collection, [UpdateOne(id_filter(id), {"$set": {"order": position}}) for position, id in enumerate(ids)])
+        elif op.op == "recategorize":
+            if category_field is None:
+                raise ValueError(f"{op.collection} não tem categoria")
+            if not op.category:
+                raise ValueError("informe a categoria")
+            category = op.category
+            if category_field == "category_id":
+                category = await self.resolve_category(op.category)
+                if category is None:
+                    raise ValueError(f"categoria desconhecida: {op.category}")
+            fields = {category_field: category}
+            if collection in TIMESTAMPED_COLLECTIONS:
+                fields["updated_at"] = now
+            self.add(collection, [UpdateMany(target, {"$set": to_storage(fields)})])
+        else:
+            raise ValueError(f"operação desconhecida: {op.op}")
+
+    async def execute(self, ordered, session=None):
+        results = {}
+        for collection, requests in self.groups:
+            result = await db[collection].bulk_write(requests, ordered=ordered, session=session)
+            totals = results.setdefault(collection, {"matched": 0, "modified": 0, "deleted": 0})
+            totals["matched"] += result.matched_count
+            totals["modified"] += result.modified_count
+            totals["deleted"] += result.deleted_count
+        return results
+
+@api_router.post("/admin/bulk")
+async def bulk_admin(data: BulkRequest, admin: str = Depends(verify_admin)):
+    if not data.operations:
+        raise HTTPException(status_code=400, detail="Nenhuma operação informada")
+    if len(data.operations) > BULK_MAX_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"Máximo de {BULK_MAX_OPERATIONS} operações por requisição")
+    plan = BulkPlan()
+    for index, op in enumerate(data.operations):
+        try:
+            await plan.add_operation(op)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Operação {index}: {e}")
+
+    try:
+        if data.transaction:
+            async with await client.start_session() as session:
+                # with_transaction retries the whole callback on transient errors
+                results = await session.with_transaction(lambda s: plan.execute(data.ordered, s))
+        else:
+            results = await plan.execute(data.ordered)
+    except BulkWriteError as e:
+        return JSONResponse(status_code=400, content={
+            "detail": f"{len(e.details['writeErrors'])} operações falharam",
+            "errors": [{"index": err["index"], "message": err["errmsg"]} for err in e.details["writeErrors"][:20]],
+        })
+    except OperationFailure as e:
+        if e.code == 20:
+            raise HTTPException(status_code=400, detail="Transações exigem MongoDB em replica set")
+        raise
+
+    touched = {collection for collection, _ in plan.groups}
+    if any(op.op == "delete" and op.collection == "tutorials" for op in data.operations):
+        maintenance.trigger("orphan-comments")
+    if touched & {"tutorials", "blog_posts", "faqs"}:
+        await faq_matcher.reload()
+        await autocomplete.reload()
+    return {"operations": len(data.operations), "transaction": data.transaction, "results": results}
+
+# ==================== LLM CLIENT ====================
+
+LLM_BACKEND = os.environ.get('LLM_BACKEND', 'emergent')
+LLM_PROVIDER = os.environ.get('LLM_PROVIDER', 'gemini')
+LLM_MODEL = os.environ.get('LLM_MODEL', 'gemini-3-flash-preview')
+LLM_TIMEOUT_SECONDS = float(os.environ.get('LLM_TIMEOUT_SECONDS', '30'))
+LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES', '2'))
+LLM_RETRY_BASE_SECONDS = float(os.environ.get('LLM_RETRY_BASE_SECONDS', '0.5'))
+LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', '16'))
+LLM_FAKE_LATENCY_MS = float(os.environ.get('LLM_FAKE_LATENCY_MS', '200'))
+# Distinct system prompts with pooled clients; the prompt only changes when tutorials or FAQs do
+LLM_CLIENT_PROMPTS = int(os.environ.get('LLM_CLIENT_PROMPTS', '4'))
+
+class LLMUnavailable(Exception):
+    pass
+
+class EmergentLLMBackend:
+    """Long-lived LlmChat clients, pooled per system prompt and shared by every session.
+
+    Conversation history is owned by chat_sessions and sent with each message, so a client carries
+    no per-session state: each call checks one out, and it goes back to the pool afterwards with its
+    history reset to the system prompt."""
+
+    def __init__(self, provider, model, max_prompts):
+        self.provider = provider
+        self.model = model
+        self.max_prompts = max_prompts
+        self._clients = OrderedDict()
+        self._chat_module = None
+
+    @property
+    def configured(self):
+        return bool(os.environ.get('EMERGENT_LLM_KEY'))
+
+    async def start(self):
+        if self._chat_module is None:
+            # The import pulls in litellm and provider SDKs; keep it off the event loop
+            self._chat_module = await asyncio.to_thread(importlib.import_module, "emergentintegrations.llm.chat")
+
+    def _checkout(self, system_message):
+        idle = self._clients.get(system_message)
+        if idle is None:
+            idle = self._clients[system_message] = []
+            while len(self._clients) > self.max_prompts:
+                self._clients.popitem(last=False)
+        self._clients.move_to_end(system_message)
+        if idle:
+            return idle.pop()
+        chat = self._chat_module.LlmChat(
+            api_key=os.environ['EMERGENT_LLM_KEY'],
+            session_id=f"tutoria-{self.model}",
+            system_message=system_message
+        ).with_model(self.provider, self.model)
+        # Sharing a client is only safe while its history can be reset between callers; without it one
+        # client would carry every session's turns into other users' prompts, so refuse to run at all
+        if not isinstance(getattr(chat, "messages", None), list):
+            raise RuntimeError("LlmChat no longer keeps its history in a messages list; pooled clients can't be reset")
+        chat._initial_messages = list(chat.messages)
+        return chat
+
+    def _checkin(self, system_message, chat):
+        # LlmChat appends every exchange to its in-memory messages; drop them so the next caller starts clean
+        chat.messages = list(chat._initial_messages)
+        idle = self._clients.get(system_message)
+        if idle is not None and len(idle) < LLM_MAX_CONCURRENCY:
+            idle.append(chat)
+
+    async def complete(self, session_id, system_message, text):
+        await self.start()
+        chat = self._checkout(system_message)
+        # A client that fails mid-call is not checked back in; its state is unknown
+        response = await chat.send_message(self._chat_module.UserMessage(text=text))
+        self._checkin(system_message, chat)
+        return response
+
+    async def close(self):
+        self._clients.clear()
+
+class FakeLLMBackend:
+    """Answers locally after a fixed delay; lets chat latency be benchmarked without spending LLM budget."""
+
+    configured = True
+
+    def __init__(self, provider, model, max_prompts):
+        self.provider = provider
+        self.model = model
+
+    async def start(self):
+        pass
+
+    async def complete(self, session_id, system_message, text):
+        await asyncio.sleep(LLM_FAKE_LATENCY_MS / 1000)
+        return f"[{self.provider}/{self.model}] {text}"
+
+    async def close(self):
+        pass
+
+LLM_BACKENDS = {
+    "emergent": EmergentLLMBackend,
+    "fake": FakeLLMBackend,
+}
+
+class LLMClientPool:
+    """Long-lived LLM access with bounded concurrency, per-call timeouts and jittered retries."""
+
+    def __init__(self, backend, timeout, max_retries, retry_base, max_concurrency):
+        self.backend = backend
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def start(self):
+        await self.backend.start()
+
+    async def complete(self, session_id, system_message, text):
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    return await asyncio.wait_for(
+                        self.backend.complete(session_id, system_message, text), timeout=self.timeout
+                    )
+                except Exception as e:
+                    if attempt == self.max_retries:
+                        logger.error(f"LLM call failed after {attempt + 1} attempts: {e}")
+                        raise LLMUnavailable(str(e)) from e
+                    # Full jitter keeps retries from piling onto the provider in lockstep
+                    delay = random.uniform(0, self.retry_base * 2 ** attempt)
+                    logger.warning(f"LLM call failed ({e}), retrying in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+
+    async def close(self):
+        await self.backend.close()
+
+def build_llm_pool():
+    backend_class = LLM_BACKENDS.get(LLM_BACKEND)
+    if backend_class is None:
+        raise RuntimeError(f"Unknown LLM_BACKEND '{LLM_BACKEND}', expected one of {sorted(LLM_BACKENDS)}")
+    backend = backend_class(LLM_PROVIDER, LLM_MODEL, LLM_CLIENT_PROMPTS)
+    return LLMClientPool(backend, LLM_TIMEOUT_SECONDS, LLM_MAX_RETRIES, LLM_RETRY_BASE_SECONDS, LLM_MAX_CONCURRENCY)
+
+llm_pool = build_llm_pool()
+
+# ==================== CHAT SESSIONS ====================
+
+CHAT_SESSION_MAX = int(os.environ.get('CHAT_SESSION_MAX', '1000'))
+CHAT_SESSION_TTL_SECONDS = float(os.environ.get('CHAT_SESSION_TTL_SECONDS', '1800'))
+CHAT_SESSION_MAX_TURNS = int(os.environ.get('CHAT_SESSION_MAX_TURNS', '12'))
+CHAT_HISTORY_TOKEN_BUDGET = int(os.environ.get('CHAT_HISTORY_TOKEN_BUDGET', '1200'))
+CHAT_SUMMARY_TOKEN_BUDGET = int(os.environ.get('CHAT_SUMMARY_TOKEN_BUDGET', '300'))
+CHAT_SUMMARY_LINE_CHARS = 160
+CHAT_SESSION_PRUNE_SECONDS = float(os.environ.get('CHAT_SESSION_PRUNE_SECONDS', '60'))
+
+def estimate_tokens(text):
+    # ~4 characters per token is close enough for budgeting Portuguese and English text
+    return len(text) // 4 + 1
+
+class ChatSession:
+    def __init__(self):
+        self.turns = deque()
+        self.summary = deque()
+        self.turn_tokens = 0
+        self.summary_tokens = 0
+        self.touched = time.monotonic()
+
+class ChatSessionStore:
+    """Server-owned chat history with LRU/TTL eviction.
+
+    Each session keeps its most recent turns verbatim within a token budget; older turns are
+    compacted into one-line notes, and the oldest notes are dropped once those exceed their own
+    budget, so the prompt stays the same size however long the conversation runs."""
+
+    def __init__(self, max_sessions, ttl, max_turns, token_budget, summary_budget):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self._sessions = OrderedDict()
+        self.stats = {"evicted_lru": 0, "evicted_ttl": 0, "compacted_turns": 0}
+
+    def _expired(self, session, now):
+        return now - session.touched > self.ttl
+
+    def history(self, session_id):
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        if self._expired(session, time.monotonic()):
+            del self._sessions[session_id]
+            self.stats["evicted_ttl"] += 1
+            return None
+        return session
+
+    def render(self, session_id):
+        session = self.history(session_id)
+        if session is None:
+            return ""
+        parts = []
+        if session.summary:
+            parts.append("Resumo do início da conversa:\n" + "\n".join(session.summary))
+        if session.turns:
+            labels = {"user": "Usuário", "assistant": "Assistente"}
+            parts.append("\n".join(f"{labels[role]}: {text}" for role, text, _ in session.turns))
+        return "\n\n".join(parts)
+
+    def record(self, session_id, message, response):
+        session = self.history(session_id)
+        if session is None:
+            session = self._sessions[session_id] = ChatSession()
+        self._sessions.move_to_end(session_id)
+        session.touched = time.monotonic()
+        for role, text in (("user", message), ("assistant", response)):
+            tokens = estimate_tokens(text)
+            session.turns.append((role, text, tokens))
+            session.turn_tokens += tokens
+        self._compact(session)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.stats["evicted_lru"] += 1
+
+    def _compact(self, session):
+        while session.turns and (
+            session.turn_tokens > self.token_budget or len(session.turns) > self.max_turns * 2
+        ):
+            role, text, tokens = session.turns.popleft()
+            session.turn_tokens -= tokens
+            self.stats["compacted_turns"] += 1
+            note = " ".join(text.split())
+            if len(note) > CHAT_SUMMARY_LINE_CHARS:
+                note = note[:CHAT_SUMMARY_LINE_CHARS].rstrip() + "…"
+            note = f"- {'Usuário' if role == 'user' else 'Assistente'}: {note}"
+            session.summary.append(note)
+            session.summary_tokens += estimate_tokens(note)
+        while session.summary and session.summary_tokens > self.summary_budget:
+            session.summary_tokens -= estimate_tokens(session.summary.popleft())
+
+    async def prune(self):
+        now = time.monotonic()
+        expired = [sid for sid, session in self._sessions.items() if self._expired(session, now)]
+        for sid in expired:
+            del self._sessions[sid]
+        self.stats["evicted_ttl"] += len(expired)
+
+    def snapshot(self):
+        return {
+            **self.stats,
+            "active": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "ttl_seconds": self.ttl,
+            "token_budget": self.token_budget,
+        }
+
+chat_sessions = ChatSessionStore(
+    CHAT_SESSION_MAX, CHAT_SESSION_TTL_SECONDS, CHAT_SESSION_MAX_TURNS,
+    CHAT_HISTORY_TOKEN_BUDGET, CHAT_SUMMARY_TOKEN_BUDGET,
+)
+
+# ==================== FAQ MATCHER ====================
+
+FAQ_MATCH_THRESHOLD = float(os.environ.get('FAQ_MATCH_THRESHOLD', '0.6'))
+# A match must share at least this many content tokens with the FAQ question (fewer only if the question
+# itself is shorter) and cover this share of them, so one common word can't stand in for a whole question
+FAQ_MATCH_MIN_TOKENS = int(os.environ.get('FAQ_MATCH_MIN_TOKENS', '2'))
+FAQ_MATCH_MIN_COVERAGE = float(os.environ.get('FAQ_MATCH_MIN_COVERAGE', '0.6'))
+FAQ_MATCH_ENABLED = os.environ.get('FAQ_MATCH_ENABLED', 'true').lower() == 'true'
+
+STOPWORDS = {
+    "a", "o", "as", "os", "um", "uma", "uns", "umas", "de", "do", "da", "dos", "das", "no", "na", "nos",
+    "nas", "em", "por", "para", "pra", "com", "sem", "e", "ou", "que", "se", "eu", "meu", "minha", "meus",
+    "minhas", "me", "voce", "seu", "sua", "como", "qual", "quais", "quando", "onde", "porque", "faco",
+    "fazer", "posso", "pode", "ao", "aos", "isso", "esse", "essa", "este", "esta", "mais", "muito",
+    "ja", "nao", "sim", "tem", "ter", "ha", "the", "is", "how", "to", "oi", "ola",
+}
+
+def fold_text(text):
+    """Lowercase and strip accents, so "Configurações" and "configuracoes" compare equal."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+def tokenize(text):
+    tokens = []
+    for token in re.findall(r"[a-z0-9]+", fold_text(text)):
+        if token in STOPWORDS or len(token) < 2:
+            continue
+        # Crude plural folding: "celulares" -> "celular", "senhas" -> "senha"
+        if len(token) > 4 and token.endswith("es") and token[-3] in "rsz":
+            token = token[:-2]
+        elif len(token) > 3 and token.endswith("s"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+def tfidf_vector(tokens, idf):
+    counts = {}
+    for token in tokens:
+        counts[token] = counts.get(token, 0) + 1
+    vector = {token: count * idf.get(token, 1.0) for token, count in counts.items()}
+    norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+    return {token: weight / norm for token, weight in vector.items()}
+
+class FAQMatcher:
+    """Answers chat messages straight from the FAQ when one question is a close enough match.
+
+    Scores blend TF-IDF cosine similarity with token-set overlap, both over accent-folded,
+    stopword-free tokens of the FAQ questions. Only questions the message covers well enough
+    (FAQ_MATCH_MIN_TOKENS, FAQ_MATCH_MIN_COVERAGE) are scored at all."""
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.faqs = {}
+        self.tutorials = {}
+        self.category_ids = {}
+        self.idf = {}
+        self.vectors = {}
+        self.stats = {"faq_answers": 0, "llm_calls": 0}
+
+    def _reindex(self):
+        documents = {faq_id: set(faq["tokens"]) for faq_id, faq in self.faqs.items()}
+        total = len(documents)
+        frequency = {}
+        for tokens in documents.values():
+            for token in tokens:
+                frequency[token] = frequency.get(token, 0) + 1
+        self.idf = {token: math.log((1 + total) / (1 + count)) + 1 for token, count in frequency.items()}
+        self.vectors = {faq_id: tfidf_vector(faq["tokens"], self.idf) for faq_id, faq in self.faqs.items()}
+
+    def _add_faq(self, faq):
+        self.faqs[faq["id"]] = {**faq, "tokens": tokenize(faq["question"])}
+
+    def add_faq(self, faq):
+        self._add_faq(faq)
+        self._reindex()
+
+    def remove_faq(self, faq_id):
+        if self.faqs.pop(faq_id, None) is not None:
+            self._reindex()
+
+    def upsert_tutorial(self, tutorial):
+        text = " ".join([tutorial["title"], tutorial.get("description", ""), " ".join(tutorial.get("tags", []))])
+        self.tutorials[tutorial["id"]] = {
+            "slug": tutorial["slug"],
+            "title": tutorial["title"],
+            "category_id": tutorial.get("category_id"),
+            "tokens": set(tokenize(text)),
+        }
+
+    def remove_tutorial(self, tutorial_id):
+        self.tutorials.pop(tutorial_id, None)
+
+    async def reload(self):
+        faqs = await db.faqs.find({}, {"question": 1, "answer": 1, "category": 1}).to_list(None)
+        tutorials = await db.tutorials.find(
+            {}, {"title": 1, "slug": 1, "description": 1, "tags": 1, "category_id": 1}
+        ).to_list(None)
+        categories = await db.categories.find({}, {"slug": 1}).to_list(None)
+        self.faqs = {}
+        for faq in map(from_storage, faqs):
+            self._add_faq(faq)
+        self.tutorials = {}
+        for tutorial in map(from_storage, tutorials):
+            self.upsert_tutorial(tutorial)
+        self.category_ids = {c["slug"]: c["id"] for c in map(from_storage, categories)}
+        self._reindex()
+
+    def related_tutorial(self, faq):
+        tokens = set(faq["tokens"]) | set(tokenize(faq["answer"]))
+        category_id = self.category_ids.get(faq.get("category"))
+        best, best_overlap = None, 0
+        for tutorial in self.tutorials.values():
+            overlap = len(tokens & tutorial["tokens"])
+            # Prefer tutorials from the FAQ's own category on equal overlap
+            if category_id and tutorial["category_id"] == category_id:
+                overlap += 0.5
+            if overlap > best_overlap:
+                best, best_overlap = tutorial, overlap
+        return best if best_overlap >= 1 else None
+
+    def match(self, message):
+        tokens = tokenize(message)
+        if not tokens or not self.faqs:
+            return None
+        query = tfidf_vector(tokens, self.idf)
+        query_tokens = set(tokens)
+        best_id, best_score = None, 0.0
+        for faq_id, vector in self.vectors.items():
+            faq_tokens = set(self.faqs[faq_id]["tokens"])
+            shared = len(query_tokens & faq_tokens)
+            if shared < min(FAQ_MATCH_MIN_TOKENS, len(faq_tokens)) or shared < FAQ_MATCH_MIN_COVERAGE * len(faq_tokens):
+                continue
+            cosine = sum(weight * vector.get(token, 0.0) for token, weight in query.items())
+            overlap = shared / len(query_tokens | faq_tokens)
+            score = 0.7 * cosine + 0.3 * overlap
+            if score > best_score:
+                best_id, best_score = faq_id, score
+        if best_score < self.threshold:
+            return None
+        return self.faqs[best_id], best_score
+
+    def answer(self, message, session_id):
+        match = self.match(message) if FAQ_MATCH_ENABLED else None
+        if match is None:
+            self.stats["llm_calls"] += 1
+            return None
+        faq, score = match
+        self.stats["faq_answers"] += 1
+        response = faq["answer"]
+        tutorial = self.related_tutorial(faq)
+        if tutorial:
+            response += f"\n\n📘 Veja também o tutorial: [{tutorial['title']}](/tutoriais/{tutorial['slug']})"
+        return ChatResponse(
+            response=response,
+            session_id=session_id,
+            source="faq",
+            faq_id=faq["id"],
+            tutorial_slug=tutorial["slug"] if tutorial else None,
+        )
+
+faq_matcher = FAQMatcher(FAQ_MATCH_THRESHOLD)
+
+@api_router.get("/admin/chat/stats")
+async def get_chat_stats(admin: str = Depends(verify_admin)):
+    total = faq_matcher.stats["faq_answers"] + faq_matcher.stats["llm_calls"]
+    return {
+        **faq_matcher.stats,
+        "llm_calls_avoided": faq_matcher.stats["faq_answers"],
+        "faq_answer_rate": round(faq_matcher.stats["faq_answers"] / total, 3) if total else 0.0,
+        "threshold": faq_matcher.threshold,
+        "indexed_faqs": len(faq_matcher.faqs),
+        "sessions": chat_sessions.snapshot(),
+    }
+
+# ==================== AUTOCOMPLETE ====================
+
+AUTOCOMPLETE_REFRESH_SECONDS = float(os.environ.get('AUTOCOMPLETE_REFRESH_SECONDS', '300'))
+# Hard cap on keys scanned for one prefix; only reached by one-letter prefixes over very large indexes
+AUTOCOMPLETE_MAX_SCAN = int(os.environ.get('AUTOCOMPLETE_MAX_SCAN', '50000'))
+AUTOCOMPLETE_CACHE_SIZE = int(os.environ.get('AUTOCOMPLETE_CACHE_SIZE', '1024'))
+AUTOCOMPLETE_MAX_LIMIT = 20
+
+class AutocompleteIndex:
+    """Prefix index over tutorial and blog titles, tags and category names.
+
+    Keys are accent-folded phrases starting at every word of the text, kept in one sorted
+    list, so "wifi" also finds "Configurar WiFi". Punctuation splits words: "Wi-Fi" is found
+    by "wi fi" or "fi", not by "wifi". A lookup scans every key under the prefix, so the most
+    popular matches win however many there are, and the ranked result is cached per prefix
+    until the index changes. Tags are shared entries whose weight is the sum of the tutorials
+    and posts using them."""
+
+    def __init__(self):
+        self._keys = []
+        self._entries = {}
+        self._tag_sources = {}
+        self._results = OrderedDict()
+
+    @staticmethod
+    def _words(text):
+        return re.findall(r"[a-z0-9]+", fold_text(text))
+
+    def _unindex(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._results.clear()
+        for phrase in entry["phrases"]:
+            i = bisect.bisect_left(self._keys, (phrase, key))
+            if i < len(self._keys) and self._keys[i] == (phrase, key):
+                del self._keys[i]
+
+    def _index(self, key, suggestion, weight):
+        self._unindex(key)
+        self._results.clear()
+        words = self._words(suggestion["text"])
+        phrases = {" ".join(words[i:]) for i in range(len(words))}
+        # The phrase starting at the first word, for the start-of-text boost
+        head = " ".join(words)
+        self._entries[key] = {"suggestion": suggestion, "weight": weight, "phrases": phrases, "head": head}
+        for phrase in phrases:
+            bisect.insort(self._keys, (phrase, key))
+
+    def _set_tags(self, source, tags, weight):
+        for tag_key in [k for k, sources in self._tag_sources.items() if source in sources]:
+            self._tag_sources[tag_key].pop(source)
+        for tag in tags:
+            tag_key = ("tag", fold_text(tag))
+            self._tag_sources.setdefault(tag_key, {})[source] = weight
+            if tag_key not in self._entries:
+                self._index(tag_key, {"type": "tag", "text": tag}, 0)
+        self._results.clear()
+        for tag_key, sources in list(self._tag_sources.items()):
+            if sources:
+                self._entries[tag_key]["weight"] = sum(sources.values())
+            else:
+                del self._tag_sources[tag_key]
+                self._unindex(tag_key)
+
+    def upsert_tutorial(self, tutorial):
+        key = ("tutorial", tutorial["id"])
+        weight = 1 + math.log1p(tutorial.get("views", 0))
+        self._index(key, {"type": "tutorial", "text": tutorial["title"], "slug": tutorial["slug"]}, weight)
+        self._set_tags(key, tutorial.get("tags", []), weight)
+
+    def upsert_blog_post(self, post):
+        key = ("blog", post["id"])
+        self._index(key, {"type": "blog", "text": post["title"], "slug": post["slug"]}, 1.0)
+        self._set_tags(key, post.get("tags", []), 1.0)
+
+    def upsert_category(self, category):
+        self._index(
+            ("category", category["id"]),
+            {"type": "category", "text": category["name"], "slug": category["slug"]},
+            1.0,
+        )
+
+    def remove(self, key):
+        self._unindex(key)
+        if key[0] in ("tutorial", "blog"):
+            self._set_tags(key, [], 0)
+
+    async def reload(self):
+        tutorials = await db.tutorials.find({}, {"title": 1, "slug": 1, "tags": 1, "views": 1}).to_list(None)
+        posts = await db.blog_posts.find({}, {"title": 1, "slug": 1, "tags": 1}).to_list(None)
+        categories = await db.categories.find({}, {"name": 1, "slug": 1}).to_list(None)
+        # Build into a fresh index and swap, so lookups never see a half-built one
+        fresh = AutocompleteIndex()
+        for tutorial in map(from_storage, tutorials):
+            fresh.upsert_tutorial(tutorial)
+        for post in map(from_storage, posts):
+            fresh.upsert_blog_post(post)
+        for category in map(from_storage, categories):
+            fresh.upsert_category(category)
+        self._keys, self._entries, self._tag_sources = fresh._keys, fresh._entries, fresh._tag_sources
+        self._results = OrderedDict()
+
+    def suggest(self, prefix, limit):
+        query = " ".join(re.findall(r"[a-z0-9]+", fold_text(prefix[:100])))
+        if not query:
+            return []
+        # A trailing space means the last word is complete
+        if prefix.endswith(" "):
+            query += " "
+        ranked = self._results.get(query)
+        if ranked is None:
+            ranked = self._rank(query)
+            self._results[query] = ranked
+            while len(self._results) > AUTOCOMPLETE_CACHE_SIZE:
+                self._results.popitem(last=False)
+        else:
+            self._results.move_to_end(query)
+        return [self._entries[k]["suggestion"] for k in ranked[:limit]]
+
+    def _rank(self, query):
+        scores = {}
+        i = bisect.bisect_left(self._keys, (query,))
+        end = min(len(self._keys), i + AUTOCOMPLETE_MAX_SCAN)
+        while i < end and self._keys[i][0].startswith(query):
+            phrase, key = self._keys[i]
+            entry = self._entries[key]
+            # Matches at the start of the text rank above mid-text word matches
+            score = entry["weight"] * (2 if phrase == entry["head"] else 1)
+            scores[key] = max(scores.get(key, 0), score)
+            i += 1
+        return heapq.nsmallest(
+            AUTOCOMPLETE_MAX_LIMIT, scores, key=lambda k: (-scores[k], self._entries[k]["suggestion"]["text"])
+        )
+
+autocomplete = AutocompleteIndex()
+
+@api_router.get("/autocomplete")
+async def get_autocomplete(q: str, limit: int = 8):
+    limit = max(1, min(limit, AUTOCOMPLETE_MAX_LIMIT))
+    return {"query": q, "suggestions": autocomplete.suggest(q, limit)}
 
 # ==================== AI CHAT ROUTE ====================
 
-@api_router.post("/chat", response_model=ChatResponse)
+@api_router.post("/chat", response_model=ChatResponse, dependencies=[Depends(rate_limit("chat"))])
 async def chat_with_ai(data: ChatMessage):
-    from emergentintegrations.llm.chat import LlmChat, UserMessage
+    session_id = data.session_id or str(uuid.uuid4())
     
-    api_key = os.environ.get('EMERGENT_LLM_KEY')
-    if not api_key:
-        raise HTTPException(status_code=500, detail="API key não configurada")
+    # Near-duplicates of an FAQ are answered from the stored answer, skipping the LLM round trip
+    faq_response = faq_matcher.answer(data.message, session_id)
+    if faq_response is not None:
+        chat_sessions.record(session_id, data.message, faq_response.response)
+        return faq_response
     
-    session_id = data.session_id or str(uuid.uuid4())
+    if not llm_pool.backend.configured:
+        raise HTTPException(status_code=500, detail="API key não configurada")
     
     # Get tutorials for context
     tutorials = await db.tutorials.find({}, {"_id": 0, "title": 1, "description": 1, "slug": 1}).to_list(20)
@@ -382,15 +2532,19 @@ Perguntas frequentes:
 Se a pergunta for relacionada a algum tutorial disponível, sugira o tutorial específico.
 Responda de forma concisa mas completa. Use markdown para formatação quando apropriado."""
 
-    chat = LlmChat(
-        api_key=api_key,
-        session_id=session_id,
-        system_message=system_message
-    ).with_model("gemini", "gemini-3-flash-preview")
-    
-    user_message = UserMessage(text=data.message)
-    response = await chat.send_message(user_message)
+    # History travels with the message, so the system prompt (and the pooled client behind it) is shared by all sessions
+    message = data.message
+    history = chat_sessions.render(session_id)
+    if history:
+        message = f"Histórico desta conversa (use como contexto):\n{history}\n\nMensagem atual do usuário:\n{data.message}"
+
+    try:
+        with trace_phase("llm", llm_pool.backend.model):
+            response = await llm_pool.complete(session_id, system_message, message)
+    except LLMUnavailable:
+        raise HTTPException(status_code=503, detail="Assistente indisponível no momento, tente novamente")
     
+    chat_sessions.record(session_id, data.message, response)
     return ChatResponse(response=response, session_id=session_id)
 
 # ==================== SEED DATA ====================
@@ -410,7 +2564,7 @@ async def seed_data(admin: str = Depends(verify_admin)):
         existing = await db.categories.find_one({"slug": cat_data["slug"]})
         if not existing:
             cat = Category(**cat_data)
-            await db.categories.insert_one(cat.model_dump())
+            await db.categories.insert_one(to_storage(cat.model_dump()))
     
     # Tutorials
     tutorials_data = [
@@ -635,13 +2789,14 @@ Use DNS mais rápidos:
     
     for tut_data in tutorials_data:
         # Find category id
-        cat = await db.categories.find_one({"slug": tut_data["category_id"]})
+        cat = from_storage(await db.categories.find_one({"slug": tut_data["category_id"]}))
         if cat:
             tut_data["category_id"] = cat["id"]
         existing = await db.tutorials.find_one({"slug": tut_data["slug"]})
         if not existing:
-            tut = Tutorial(**tut_data)
-            await db.tutorials.insert_one(tut.model_dump())
+            tut = to_storage(Tutorial(**tut_data).model_dump())
+            await content_store.externalize([tut])
+            await db.tutorials.insert_one(tut)
     
     # FAQs
     faqs_data = [
@@ -656,7 +2811,7 @@ Use DNS mais rápidos:
         existing = await db.faqs.find_one({"question": faq_data["question"]})
         if not existing:
             faq = FAQ(**faq_data)
-            await db.faqs.insert_one(faq.model_dump())
+            await db.faqs.insert_one(to_storage(faq.model_dump()))
     
     # Blog posts
     blog_data = [
@@ -690,11 +2845,383 @@ Fique atento a essas tendências para não ficar para trás!""",
     for blog in blog_data:
         existing = await db.blog_posts.find_one({"slug": blog["slug"]})
         if not existing:
-            post = BlogPost(**blog)
-            await db.blog_posts.insert_one(post.model_dump())
+            post = to_storage(BlogPost(**blog).model_dump())
+            await content_store.externalize([post])
+            await db.blog_posts.insert_one(post)
     
+    await faq_matcher.reload()
+    await autocomplete.reload()
     return {"message": "Dados iniciais criados com sucesso"}
 
+# ==================== BULK IMPORT ====================
+
+IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', '500'))
+IMPORT_MAX_ERROR_SAMPLES = 100
+
+# kind -> (input model, stored model, collection, natural key used for upserts)
+IMPORT_KINDS = {
+    "tutorials": (TutorialCreate, Tutorial, "tutorials", "slug"),
+    "blog": (BlogPostCreate, BlogPost, "blog_posts", "slug"),
+    # FAQs have no slug; the question is what seed_data already dedupes on
+    "faqs": (FAQCreate, FAQ, "faqs", "question"),
+}
+
+async def iter_lines(chunks):
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+class BulkImport:
+    def __init__(self, kind, chunk_size=IMPORT_CHUNK_SIZE):
+        self.kind = kind
+        self.create_model, self.model, self.collection, self.key = IMPORT_KINDS[kind]
+        self.chunk_size = chunk_size
+        self.category_ids = {}
+        self.stats = {"kind": kind, "rows": 0, "valid": 0, "inserted": 0, "updated": 0, "unchanged": 0, "errors": 0}
+        self.error_samples = []
+
+    def error(self, line_number, message):
+        self.stats["errors"] += 1
+        if len(self.error_samples) < IMPORT_MAX_ERROR_SAMPLES:
+            self.error_samples.append({"line": line_number, "error": message})
+
+    async def load_categories(self):
+        # category_id may hold either a category id or its slug, as in seed_data
+        async for cat in db.categories.find({}, {"id": 1, "slug": 1}):
+            cat = from_storage(cat)
+            self.category_ids[cat["id"]] = cat["id"]
+            self.category_ids[cat["slug"]] = cat["id"]
+
+    def to_row(self, line_number, line):
+        try:
+            data = self.create_model.model_validate_json(line)
+        except ValidationError as e:
+            self.error(line_number, "; ".join(
+                f"{'.'.join(map(str, err['loc']))}: {err['msg']}" if err['loc'] else err['msg'] for err in e.errors()
+            ))
+            return None
+        fields = data.model_dump()
+        if self.kind == "tutorials":
+            category_id = self.category_ids.get(fields["category_id"])
+            if category_id is None:
+                self.error(line_number, f"categoria desconhecida: {fields['category_id']}")
+                return None
+            fields["category_id"] = category_id
+        document = self.model(**fields).model_dump()
+        if "updated_at" in document:
+            fields["updated_at"] = document["updated_at"]
+        # Imports overwrite editable fields but keep ids, timestamps and counters of existing documents
+        on_insert = {k: v for k, v in document.items() if k not in fields}
+        return to_storage(fields), to_storage(on_insert)
+
+    async def write(self, rows, line_numbers):
+        if not rows:
+            return
+        if self.collection in CONTENT_COLLECTIONS:
+            await content_store.externalize([fields for fields, _ in rows])
+        operations = []
+        for fields, on_insert in rows:
+            update = {"$set": fields, "$setOnInsert": on_insert}
+            if "content_hash" in fields:
+                update["$unset"] = {"content": ""}
+            operations.append(UpdateOne({self.key: fields[self.key]}, update, upsert=True))
+        try:
+            result = await db[self.collection].bulk_write(operations, ordered=False)
+            details = result.bulk_api_result
+        except BulkWriteError as e:
+            details = e.details
+            for write_error in details.get("writeErrors", []):
+                self.error(line_numbers[write_error["index"]], write_error.get("errmsg", "erro de escrita"))
+        self.stats["inserted"] += details.get("nUpserted", 0)
+        self.stats["updated"] += details.get("nModified", 0)
+        self.stats["unchanged"] += details.get("nMatched", 0) - details.get("nModified", 0)
+
+    async def run(self, lines):
+        started = time.perf_counter()
+        if self.kind == "tutorials":
+            await self.load_categories()
+        rows, line_numbers = [], []
+        line_number = 0
+        async for line in lines:
+            line_number += 1
+            if not line.strip():
+                continue
+            self.stats["rows"] += 1
+            row = self.to_row(line_number, line)
+            if row is None:
+                continue
+            self.stats["valid"] += 1
+            rows.append(row)
+            line_numbers.append(line_number)
+            if len(rows) >= self.chunk_size:
+                await self.write(rows, line_numbers)
+                rows, line_numbers = [], []
+        await self.write(rows, line_numbers)
+        elapsed = time.perf_counter() - started
+        return {
+            **self.stats,
+            "seconds": round(elapsed, 3),
+            "rows_per_second": round(self.stats["rows"] / elapsed, 1) if elapsed > 0 else None,
+            "error_samples": self.error_samples,
+        }
+
+@api_router.post("/admin/import/{kind}")
+async def bulk_import(kind: str, request: Request, admin: str = Depends(verify_admin)):
+    if kind not in IMPORT_KINDS:
+        raise HTTPException(status_code=404, detail=f"Tipo de importação inválido, use: {', '.join(IMPORT_KINDS)}")
+    stats = await BulkImport(kind).run(iter_lines(request.stream()))
+    await faq_matcher.reload()
+    await autocomplete.reload()
+    return stats
+
+# ==================== IMAGE PIPELINE ====================
+
+IMAGE_FETCHER = os.environ.get('IMAGE_FETCHER', 'http')
+IMAGE_LOCAL_ROOT = Path(os.environ.get('IMAGE_LOCAL_ROOT', ROOT_DIR / 'static' / 'images'))
+IMAGE_ALLOWED_HOSTS = set(os.environ.get('IMAGE_ALLOWED_HOSTS', 'images.unsplash.com').split(','))
+IMAGE_CACHE_DIR = Path(os.environ.get('IMAGE_CACHE_DIR', ROOT_DIR / 'cache' / 'images'))
+IMAGE_CACHE_MAX_BYTES = int(os.environ.get('IMAGE_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+IMAGE_MAX_SOURCE_BYTES = int(os.environ.get('IMAGE_MAX_SOURCE_BYTES', str(15 * 1024 * 1024)))
+IMAGE_FETCH_TIMEOUT_SECONDS = float(os.environ.get('IMAGE_FETCH_TIMEOUT_SECONDS', '10'))
+IMAGE_MAX_REDIRECTS = int(os.environ.get('IMAGE_MAX_REDIRECTS', '5'))
+# Card widths used by the frontend srcset (1x and 2x of the mobile and desktop layouts)
+IMAGE_WIDTHS = (320, 480, 640, 800, 1200)
+IMAGE_FORMATS = {
+    "avif": ("AVIF", "image/avif", {"quality": 55}),
+    "webp": ("WEBP", "image/webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "image/jpeg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+IMAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+class ImageFetchError(Exception):
+    pass
+
+class HttpImageFetcher:
+    def __init__(self, allowed_hosts, max_bytes, timeout, max_redirects):
+        self.allowed_hosts = allowed_hosts
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+        self._client = None
+
+    def allows(self, url):
+        parsed = urlparse(url)
+        return parsed.scheme in ("http", "https") and parsed.hostname in self.allowed_hosts
+
+    async def fetch(self, url):
+        import httpx
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout, follow_redirects=False)
+        try:
+            # Redirects are followed by hand so every hop goes through the host allowlist,
+            # otherwise an allowed host could bounce the request to an internal address
+            for _ in range(self.max_redirects + 1):
+                async with self._client.stream("GET", url) as response:
+                    if response.is_redirect:
+                        url = urljoin(url, response.headers["location"])
+                        if not self.allows(url):
+                            raise ImageFetchError("redirecionamento para host não permitido")
+                        continue
+                    response.raise_for_status()
+                    data = bytearray()
+                    async for chunk in response.aiter_bytes():
+                        data += chunk
+                        if len(data) > self.max_bytes:
+                            raise ImageFetchError("imagem de origem grande demais")
+                    return bytes(data)
+            raise ImageFetchError("redirecionamentos demais")
+        except httpx.HTTPError as e:
+            raise ImageFetchError(str(e)) from e
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+
+class LocalImageFetcher:
+    """Resolves the URL path against a local directory, for tests and offline benchmarks."""
+
+    def __init__(self, root):
+        self.root = root.resolve()
+
+    def allows(self, url):
+        return True
+
+    async def fetch(self, url):
+        path = (self.root / urlparse(url).path.lstrip("/")).resolve()
+        if self.root not in path.parents or not path.is_file():
+            raise ImageFetchError("imagem não encontrada")
+        return await asyncio.to_thread(path.read_bytes)
+
+    async def close(self):
+        pass
+
+def build_image_fetcher():
+    if IMAGE_FETCHER == "local":
+        return LocalImageFetcher(IMAGE_LOCAL_ROOT)
+    return HttpImageFetcher(IMAGE_ALLOWED_HOSTS, IMAGE_MAX_SOURCE_BYTES, IMAGE_FETCH_TIMEOUT_SECONDS, IMAGE_MAX_REDIRECTS)
+
+class ImageCache:
+    """Content-addressed disk cache: sources are stored by the hash of their bytes, variants by
+    hash(source, width, format), and URLs only point at a source hash. Least recently read files
+    are evicted once the cache grows past max_bytes."""
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.size = None
+        self._evicting = False
+
+    def _path(self, kind, key):
+        return self.root / kind / key[:2] / key
+
+    def _read(self, path):
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        os.utime(path)
+        return data
+
+    def _write(self, path, data):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".tmp{uuid.uuid4().hex}")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    def _scan(self):
+        files = [p for p in self.root.rglob("*") if p.is_file()]
+        return [(p, p.stat()) for p in files]
+
+    def _evict(self):
+        entries = sorted(self._scan(), key=lambda entry: entry[1].st_mtime)
+        size = sum(stat.st_size for _, stat in entries)
+        target = self.max_bytes * 0.9
+        for path, stat in entries:
+            if size <= target:
+                break
+            path.unlink(missing_ok=True)
+            size -= stat.st_size
+        return size
+
+    async def get(self, kind, key):
+        return await asyncio.to_thread(self._read, self._path(kind, key))
+
+    async def put(self, kind, key, data):
+        await asyncio.to_thread(self._write, self._path(kind, key), data)
+        if self.size is None:
+            self.size = sum(stat.st_size for _, stat in await asyncio.to_thread(self._scan))
+        else:
+            self.size += len(data)
+        if self.size > self.max_bytes and not self._evicting:
+            self._evicting = True
+            try:
+                self.size = await asyncio.to_thread(self._evict)
+            finally:
+                self._evicting = False
+
+def render_variant(source, width, image_format):
+    from PIL import Image, ImageOps
+    pil_format, _, options = IMAGE_FORMATS[image_format]
+    with Image.open(io.BytesIO(source)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.width > width:
+            image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+        if image_format == "jpeg" and image.mode != "RGB":
+            image = image.convert("RGB")
+        elif image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        output = io.BytesIO()
+        image.save(output, format=pil_format, **options)
+        return output.getvalue()
+
+def supported_image_formats():
+    from PIL import features
+    # Pillow names the JPEG codec "jpg"
+    return [fmt for fmt in IMAGE_FORMATS if features.check({"jpeg": "jpg"}.get(fmt, fmt))]
+
+class ImagePipeline:
+    def __init__(self, fetcher, cache):
+        self.fetcher = fetcher
+        self.cache = cache
+        self._inflight = {}
+        self._formats = None
+
+    @property
+    def formats(self):
+        if self._formats is None:
+            self._formats = supported_image_formats()
+        return self._formats
+
+    async def _source(self, url):
+        url_key = hashlib.sha256(url.encode()).hexdigest()
+        source_key = await self.cache.get("urls", url_key)
+        if source_key is not None:
+            source = await self.cache.get("sources", source_key.decode())
+            if source is not None:
+                return source_key.decode(), source
+        source = await self.fetcher.fetch(url)
+        source_key = hashlib.sha256(source).hexdigest()
+        await self.cache.put("sources", source_key, source)
+        await self.cache.put("urls", url_key, source_key.encode())
+        return source_key, source
+
+    async def _variant(self, url, width, image_format):
+        source_key, source = await self._source(url)
+        variant_key = hashlib.sha256(f"{source_key}:{width}:{image_format}".encode()).hexdigest()
+        variant = await self.cache.get("variants", variant_key)
+        if variant is None:
+            try:
+                variant = await asyncio.to_thread(render_variant, source, width, image_format)
+            except Exception as e:
+                raise ImageFetchError(f"imagem inválida: {e}") from e
+            await self.cache.put("variants", variant_key, variant)
+        return variant_key, variant
+
+    async def variant(self, url, width, image_format):
+        # Concurrent requests for the same variant share one fetch and one resize
+        key = (url, width, image_format)
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.ensure_future(self._variant(url, width, image_format))
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+image_pipeline = ImagePipeline(build_image_fetcher(), ImageCache(IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES))
+
+def negotiate_image_format(accept, formats):
+    for image_format in formats:
+        if image_format == "jpeg" or IMAGE_FORMATS[image_format][1] in accept:
+            return image_format
+    return "jpeg"
+
+@api_router.get("/images")
+async def get_image(request: Request, url: str, w: int = 800, format: Optional[str] = None):
+    if not image_pipeline.fetcher.allows(url):
+        raise HTTPException(status_code=400, detail="URL de imagem não permitida")
+    # Snap to the configured widths so arbitrary sizes can't fill the cache
+    width = next((size for size in IMAGE_WIDTHS if size >= w), IMAGE_WIDTHS[-1])
+    if format is None:
+        image_format = negotiate_image_format(request.headers.get("accept", ""), image_pipeline.formats)
+    elif format in image_pipeline.formats:
+        image_format = format
+    else:
+        raise HTTPException(status_code=400, detail=f"Formato inválido, use: {', '.join(image_pipeline.formats)}")
+    try:
+        key, data = await image_pipeline.variant(url, width, image_format)
+    except ImageFetchError as e:
+        raise HTTPException(status_code=502, detail=f"Não foi possível processar a imagem: {e}")
+    headers = {"Cache-Control": IMAGE_CACHE_CONTROL, "ETag": f'"{key}"'}
+    if format is None:
+        headers["Vary"] = "Accept"
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=data, media_type=IMAGE_FORMATS[image_format][1], headers=headers)
+
 # ==================== STATS ====================
 
 @api_router.get("/stats")
@@ -710,6 +3237,230 @@ async def get_stats():
         "faqs": faqs_count
     }
 
+# ==================== MAINTENANCE ====================
+
+MAINTENANCE_ENABLED = os.environ.get('MAINTENANCE_ENABLED', 'true').lower() == 'true'
+MAINTENANCE_INTERVAL_SECONDS = float(os.environ.get('MAINTENANCE_INTERVAL_SECONDS', '3600'))
+MAINTENANCE_STARTUP_DELAY_SECONDS = float(os.environ.get('MAINTENANCE_STARTUP_DELAY_SECONDS', '60'))
+MAINTENANCE_BATCH_SIZE = int(os.environ.get('MAINTENANCE_BATCH_SIZE', '200'))
+# Throughput cap per job, so a long backlog is worked off gradually instead of in one burst
+MAINTENANCE_DOCS_PER_SECOND = float(os.environ.get('MAINTENANCE_DOCS_PER_SECOND', '500'))
+# Jobs pause while more requests than this are in flight, or while the database breaker is not closed
+MAINTENANCE_MAX_INFLIGHT = int(os.environ.get('MAINTENANCE_MAX_INFLIGHT', '20'))
+MAINTENANCE_QUERY_SECONDS = float(os.environ.get('MAINTENANCE_QUERY_SECONDS', '10'))
+CONTACT_RETENTION_DAYS = int(os.environ.get('CONTACT_RETENTION_DAYS', '180'))
+ORPHAN_CATEGORY_SLUG = os.environ.get('ORPHAN_CATEGORY_SLUG', 'outros')
+
+def next_checkpoint(batch, batch_size, value):
+    # A short batch means the pass reached the end; the next run starts over
+    return value if len(batch) == batch_size else None
+
+async def reconcile_orphan_comments(checkpoint, batch_size):
+    """Delete comments whose tutorial no longer exists (the cascade delete_tutorial doesn't do inline)."""
+    # Walks binary UUID _ids only; legacy ObjectId documents are left for migrate_compact.py
+    query = {"_id": {"$gt": checkpoint}} if checkpoint is not None else {}
+    comments = await db.comments.find(query, {"tutorial_id": 1}).sort("_id", 1).limit(batch_size).to_list(batch_size)
+    if not comments:
+        return None, {}
+    tutorial_ids = {from_storage(c)["tutorial_id"] for c in comments}
+    existing = await db.tutorials.find(ids_filter(tutorial_ids), {"_id": 1, "id": 1}).to_list(None)
+    existing = {from_storage(t)["id"] for t in existing}
+    orphans = [c["_id"] for c in comments if from_storage(c)["tutorial_id"] not in existing]
+    if orphans:
+        await db.comments.delete_many({"_id": {"$in": orphans}})
+    return next_checkpoint(comments, batch_size, comments[-1]["_id"]), {"scanned": len(comments), "deleted": len(orphans)}
+
+async def orphan_category_id():
+    category = Category(name="Outros", slug=ORPHAN_CATEGORY_SLUG, description="Tutoriais sem categoria")
+    stored = to_storage(category.model_dump())
+    stored.pop("slug")
+    doc = await db.categories.find_one_and_update(
+        {"slug": ORPHAN_CATEGORY_SLUG}, {"$setOnInsert": stored}, upsert=True, return_document=ReturnDocument.AFTER
+    )
+    category = from_storage(doc)
+    faq_matcher.category_ids[category["slug"]] = category["id"]
+    autocomplete.upsert_category(category)
+    return category["id"]
+
+async def reconcile_orphan_tutorials(checkpoint, batch_size):
+    """Move tutorials whose category was deleted into the ORPHAN_CATEGORY_SLUG category."""
+    query = {"_id": {"$gt": checkpoint}} if checkpoint is not None else {}
+    tutorials = await db.tutorials.find(query, {"category_id": 1}).sort("_id", 1).limit(batch_size).to_list(batch_size)
+    if not tutorials:
+        return None, {}
+    category_ids = {from_storage(t).get("category_id") for t in tutorials}
+    existing = await db.categories.find(ids_filter(category_ids), {"_id": 1, "id": 1}).to_list(None)
+    existing = {from_storage(c)["id"] for c in existing}
+    orphans = [t["_id"] for t in tutorials if from_storage(t).get("category_id") not in existing]
+    if orphans:
+        fallback = await orphan_category_id()
+        await db.tutorials.update_many({"_id": {"$in": orphans}}, {"$set": to_storage({
+            "category_id": fallback, "updated_at": datetime.now(timezone.utc).isoformat(),
+        })})
+    return next_checkpoint(tutorials, batch_size, tutorials[-1]["_id"]), {"scanned": len(tutorials), "recategorized": len(orphans)}
+
+async def archive_old_contacts(checkpoint, batch_size):
+    """Move contacts older than CONTACT_RETENTION_DAYS to contacts_archive."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=CONTACT_RETENTION_DAYS)
+    query = {"created_at": {"$lt": cutoff}}
+    if checkpoint is not None:
+        query["created_at"]["$gte"] = checkpoint
+    contacts = await db.contacts.find(query).sort("created_at", 1).limit(batch_size).to_list(batch_size)
+    if not contacts:
+        return None, {}
+    # Copy first, then delete: a run interrupted in between only re-copies (duplicates are ignored)
+    await insert_documents(db.contacts_archive, contacts)
+    await db.contacts.delete_many({"_id": {"$in": [c["_id"] for c in contacts]}})
+    return next_checkpoint(contacts, batch_size, contacts[-1]["created_at"]), {"archived": len(contacts)}
+
+class MaintenanceJob:
+    """A resumable batch job: the checkpoint is saved in `maintenance_jobs` after every batch, so a
+    restart continues where the previous process stopped instead of rescanning."""
+
+    def __init__(self, name, step, interval=MAINTENANCE_INTERVAL_SECONDS, batch_size=MAINTENANCE_BATCH_SIZE):
+        self.name = name
+        self.step = step
+        self.interval = interval
+        self.batch_size = batch_size
+        self.wake = None
+        self.state = {
+            "status": "idle", "runs": 0, "last_started": None, "last_finished": None,
+            "last_result": None, "last_error": None,
+        }
+
+    async def throttle(self):
+        while lifecycle.inflight > MAINTENANCE_MAX_INFLIGHT or db_breaker.state != "closed":
+            self.state["status"] = "waiting"
+            await asyncio.sleep(1)
+        self.state["status"] = "running"
+
+    async def run(self):
+        self.state.update(status="running", last_started=datetime.now(timezone.utc).isoformat(), last_error=None)
+        totals = {"batches": 0}
+        try:
+            saved = await db.maintenance_jobs.find_one({"_id": self.name}) or {}
+            checkpoint = saved.get("checkpoint")
+            while True:
+                await self.throttle()
+                with pymongo.timeout(MAINTENANCE_QUERY_SECONDS):
+                    checkpoint, counts = await self.step(checkpoint, self.batch_size)
+                    await db.maintenance_jobs.update_one(
+                        {"_id": self.name},
+                        {"$set": {"checkpoint": checkpoint, "updated_at": datetime.now(timezone.utc)}},
+                        upsert=True,
+                    )
+                totals["batches"] += 1
+                for key, value in counts.items():
+                    totals[key] = totals.get(key, 0) + value
+                if checkpoint is None:
+                    break
+                await asyncio.sleep(self.batch_size / MAINTENANCE_DOCS_PER_SECOND)
+        except Exception as e:
+            logger.error(f"Maintenance job {self.name} failed: {e}")
+            self.state.update(status="failed", last_error=str(e))
+        else:
+            self.state["status"] = "idle"
+        self.state.update(runs=self.state["runs"] + 1, last_finished=datetime.now(timezone.utc).isoformat(), last_result=totals)
+
+class MaintenanceScheduler:
+    def __init__(self, jobs):
+        self.jobs = {job.name: job for job in jobs}
+
+    def start(self):
+        for job in self.jobs.values():
+            job.wake = asyncio.Event()
+            start_background_task(self._loop(job), f"maintenance-{job.name}")
+
+    async def _loop(self, job):
+        delay = min(job.interval, MAINTENANCE_STARTUP_DELAY_SECONDS)
+        while True:
+            try:
+                await asyncio.wait_for(job.wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            job.wake.clear()
+            await job.run()
+            delay = job.interval
+
+    def trigger(self, name):
+        job = self.jobs[name]
+        if job.wake is not None:
+            job.wake.set()
+
+maintenance = MaintenanceScheduler([
+    MaintenanceJob("orphan-comments", reconcile_orphan_comments),
+    MaintenanceJob("orphan-tutorials", reconcile_orphan_tutorials),
+    MaintenanceJob("archive-contacts", archive_old_contacts),
+])
+
+def describe_checkpoint(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return bson_to_uuid(value)
+
+@api_router.get("/admin/maintenance")
+async def get_maintenance_jobs(admin: str = Depends(verify_admin)):
+    saved = {doc["_id"]: doc for doc in await db.maintenance_jobs.find({}).to_list(None)}
+    return [
+        {
+            "name": name,
+            **job.state,
+            "interval_seconds": job.interval,
+            "checkpoint": describe_checkpoint(saved.get(name, {}).get("checkpoint")),
+        }
+        for name, job in maintenance.jobs.items()
+    ]
+
+@api_router.post("/admin/maintenance/{name}/run")
+async def run_maintenance_job(name: str, admin: str = Depends(verify_admin)):
+    if name not in maintenance.jobs:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    if not MAINTENANCE_ENABLED:
+        raise HTTPException(status_code=409, detail="Manutenção desativada")
+    maintenance.trigger(name)
+    return {"message": "Job agendado", "name": name}
+
+# ==================== HEALTH ROUTES ====================
+
+@api_router.get("/health/live")
+async def liveness():
+    return {"status": "ok"}
+
+@api_router.get("/health/ready")
+async def readiness():
+    if lifecycle.draining:
+        return JSONResponse(status_code=503, content={"status": "draining"})
+    if not lifecycle.ready:
+        return JSONResponse(status_code=503, content={"status": "warming_up"})
+    try:
+        await asyncio.wait_for(client.admin.command("ping"), timeout=1)
+    except Exception:
+        return JSONResponse(status_code=503, content={"status": "database_unavailable"})
+    return {"status": "ready", "inflight": lifecycle.inflight}
+
+# ==================== PROFILER ROUTES ====================
+
+@api_router.get("/admin/profiler")
+async def get_profiler_report(limit: int = 20, admin: str = Depends(verify_admin)):
+    return {
+        "threshold_ms": query_profiler.threshold_ms,
+        "shapes": query_profiler.report(limit),
+    }
+
+@api_router.get("/admin/db/breaker")
+async def get_db_breaker(admin: str = Depends(verify_admin)):
+    return {
+        **db_breaker.snapshot(),
+        "stale_entries": len(stale_responses._entries),
+        "deadline_seconds": DB_DEADLINE_SECONDS,
+        "admin_deadline_seconds": DB_ADMIN_DEADLINE_SECONDS,
+    }
+
+@api_router.delete("/admin/profiler")
+async def reset_profiler(admin: str = Depends(verify_admin)):
+    query_profiler.reset()
+    return {"message": "Profiler reiniciado"}
+
 # ==================== ROOT ====================
 
 @api_router.get("/")
@@ -727,12 +3478,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Middleware added later wraps what came before: Server-Timing sits outside CORS so its total covers
+# CORS handling, and the in-flight counter is outermost so shutdown waits for the whole request
+app.add_middleware(ServerTimingMiddleware, timing_allow_origin=os.environ.get('CORS_ORIGINS', '*'))
+app.add_middleware(InflightMiddleware)
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
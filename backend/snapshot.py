@@ -0,0 +1,161 @@
+"""Stream every collection to gzipped NDJSON and restore it in parallel.
+
+Usage:
+    python snapshot.py dump DIR
+    python snapshot.py restore DIR [--drop] [--parallel N] [--batch-size N]
+
+Documents are written as canonical Extended JSON, so ObjectIds, dates and
+binary values survive the round trip. On a replica set the dump reads every
+collection, one after the other, from one snapshot session pinned to a single
+cluster time; on a standalone server it falls back to parallel plain reads and
+marks the manifest as not consistent.
+
+Snapshot reads are served from the history the server keeps for
+minSnapshotHistoryWindowInSeconds (300s by default). A consistent dump that
+runs longer than that fails with SnapshotTooOld; raise the window on the
+server for large databases.
+"""
+import argparse
+import asyncio
+import gzip
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from bson import json_util
+from bson.json_util import CANONICAL_JSON_OPTIONS
+
+from server import client, db
+
+MANIFEST = "manifest.json"
+DUMP_BATCH_SIZE = 1000
+INDEX_OPTION_BLACKLIST = {"v", "key", "ns"}
+
+
+async def supports_snapshot_reads():
+    hello = await client.admin.command("hello")
+    return "setName" in hello or hello.get("msg") == "isdbgrid"
+
+
+async def dump_collection(name, directory, session):
+    started = time.perf_counter()
+    path = directory / f"{name}.ndjson.gz"
+    count = 0
+    with gzip.open(path, "wt", encoding="utf-8", compresslevel=6) as out:
+        async for doc in db[name].find({}, session=session, batch_size=DUMP_BATCH_SIZE):
+            out.write(json_util.dumps(doc, json_options=CANONICAL_JSON_OPTIONS))
+            out.write("\n")
+            count += 1
+    indexes = await db[name].index_information()
+    return name, {
+        "file": path.name,
+        "count": count,
+        "seconds": round(time.perf_counter() - started, 3),
+        "indexes": [
+            {"key": spec["key"], "options": {"name": index_name, **{k: v for k, v in spec.items() if k not in INDEX_OPTION_BLACKLIST}}}
+            for index_name, spec in indexes.items() if index_name != "_id_"
+        ],
+    }
+
+
+async def dump(directory):
+    directory.mkdir(parents=True, exist_ok=True)
+    names = sorted(n for n in await db.list_collection_names() if not n.startswith("system."))
+    consistent = await supports_snapshot_reads()
+    if not consistent:
+        print("warning: server is not a replica set, dumping without a snapshot session", file=sys.stderr)
+    started_at = datetime.now(timezone.utc)
+    snapshot_time = None
+    if consistent:
+        session = await client.start_session(snapshot=True)
+        try:
+            if names:
+                # The first read fixes atClusterTime for every later read in the session; the server
+                # reports that time as the operationTime of a snapshot read
+                await db[names[0]].find_one({}, session=session)
+                snapshot_time = session.operation_time
+            # A session must not be used concurrently, so collections are read one at a time
+            results = [await dump_collection(name, directory, session) for name in names]
+        finally:
+            await session.end_session()
+    else:
+        results = await asyncio.gather(*[dump_collection(name, directory, None) for name in names])
+    manifest = {
+        "database": db.name,
+        "started_at": started_at.isoformat(),
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+        "consistent": consistent,
+        "snapshot_time": snapshot_time,
+        "collections": dict(results),
+    }
+    (directory / MANIFEST).write_text(json_util.dumps(manifest, indent=2))
+    return manifest
+
+
+def read_batch(stream, batch_size):
+    batch = []
+    for line in stream:
+        batch.append(json_util.loads(line))
+        if len(batch) >= batch_size:
+            break
+    return batch
+
+
+async def restore_collection(name, info, directory, drop, batch_size, semaphore):
+    async with semaphore:
+        started = time.perf_counter()
+        collection = db[name]
+        if drop:
+            await collection.drop()
+        count = 0
+        with gzip.open(directory / info["file"], "rt", encoding="utf-8") as stream:
+            while True:
+                # Decompression and parsing run off the loop so collections restore side by side
+                batch = await asyncio.to_thread(read_batch, stream, batch_size)
+                if not batch:
+                    break
+                await collection.insert_many(batch, ordered=False)
+                count += len(batch)
+        # Building indexes once after the load is much cheaper than maintaining them per insert
+        for index in info["indexes"]:
+            await collection.create_index(index["key"], **index["options"])
+        return name, {"count": count, "seconds": round(time.perf_counter() - started, 3)}
+
+
+async def restore(directory, drop, parallel, batch_size):
+    manifest = json_util.loads((directory / MANIFEST).read_text())
+    semaphore = asyncio.Semaphore(parallel)
+    results = await asyncio.gather(*[
+        restore_collection(name, info, directory, drop, batch_size, semaphore)
+        for name, info in manifest["collections"].items()
+    ])
+    return {"database": db.name, "source": manifest["database"], "collections": dict(results)}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Snapshot and restore the Tutoria Fácil database")
+    commands = parser.add_subparsers(dest="command", required=True)
+    dump_parser = commands.add_parser("dump")
+    dump_parser.add_argument("directory", type=Path)
+    restore_parser = commands.add_parser("restore")
+    restore_parser.add_argument("directory", type=Path)
+    restore_parser.add_argument("--drop", action="store_true", help="drop each collection before loading it")
+    restore_parser.add_argument("--parallel", type=int, default=4)
+    restore_parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    try:
+        if args.command == "dump":
+            report = await dump(args.directory)
+        else:
+            report = await restore(args.directory, args.drop, args.parallel, args.batch_size)
+    finally:
+        client.close()
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    print(json_util.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -3,6 +3,7 @@ import sys
 import json
 from datetime import datetime
 import base64
+import ipaddress
 
 class TutoriaFacilAPITester:
     def __init__(self, base_url="https://tutoria-facil.preview.emergentagent.com/api"):
@@ -60,6 +61,12 @@ class TutoriaFacilAPITester:
         """Test stats endpoint"""
         return self.run_test("Stats", "GET", "stats", 200)
 
+    def test_health_endpoints(self):
+        """Test liveness and readiness probes"""
+        success, _ = self.run_test("Liveness", "GET", "health/live", 200)
+        ready, _ = self.run_test("Readiness", "GET", "health/ready", 200)
+        return success and ready
+
     def test_categories_crud(self):
         """Test categories CRUD operations"""
         print("\n📁 Testing Categories CRUD...")
@@ -283,6 +290,74 @@ class TutoriaFacilAPITester:
         
         return success
 
+    def test_rate_limit(self):
+        """Test that the contact rate limit is kept per client and can't be bypassed with a spoofed X-Forwarded-For"""
+        print("\n🚦 Testing Rate Limit...")
+        
+        success, me = self.run_test("Rate Limit Client", "GET", "admin/rate-limits", 200, auth=self.admin_auth)
+        if not success:
+            return False
+        contact_limit = me["limits"]["contact"]["burst"]
+        url = f"{self.base_url}/contact"
+        contact_data = {
+            "name": "Rate Limit Test",
+            "email": "ratelimit@example.com",
+            "subject": "Rate limit",
+            "message": "Rate limit test message"
+        }
+        
+        def post_contact(forwarded):
+            headers = {'Content-Type': 'application/json', 'X-Forwarded-For': forwarded}
+            return self.session.post(url, json=contact_data, headers=headers)
+        
+        def exhaust(forwarded):
+            # Earlier tests may already have used part of the budget, so the 429 can come sooner
+            for attempt in range(1, contact_limit + 2):
+                response = post_contact(forwarded(attempt))
+                if response.status_code == 429:
+                    return response
+            return None
+        
+        self.tests_run += 1
+        probe = self.session.get(f"{self.base_url}/admin/rate-limits", headers={'X-Forwarded-For': "198.51.100.20"}, auth=self.admin_auth).json()
+        if probe["client_ip"] == "198.51.100.20":
+            # We reach the app from one of its trusted proxy addresses (e.g. locally), so X-Forwarded-For names
+            # the client and two clients can be told apart
+            throttled = exhaust(lambda attempt: "198.51.100.10")
+            if throttled is None or not throttled.headers.get("Retry-After"):
+                print("❌ Failed - client 198.51.100.10 was not throttled with Retry-After")
+                return False
+            spoofed = post_contact("203.0.113.1, 198.51.100.10")
+            if spoofed.status_code != 429:
+                print(f"❌ Failed - a client-written X-Forwarded-For entry bypassed the limit ({spoofed.status_code})")
+                return False
+            other = post_contact("198.51.100.20")
+            if other.status_code != 200:
+                print(f"❌ Failed - client 198.51.100.20 shares 198.51.100.10's bucket ({other.status_code})")
+                return False
+            self.tests_passed += 1
+            print(f"✅ Passed - separate buckets per client, Retry-After: {throttled.headers['Retry-After']}s")
+            return True
+        
+        # Through the ingress our own address is appended after anything we send, so only one client can be
+        # exercised: the key must be that address, not the ingress's shared one, and spoofing must not change it
+        if probe["client_ip"] != me["client_ip"]:
+            print(f"❌ Failed - spoofed X-Forwarded-For changed the key ({me['client_ip']} -> {probe['client_ip']})")
+            return False
+        try:
+            if ipaddress.ip_address(me["client_ip"]).is_private:
+                print(f"❌ Failed - requests are keyed on the proxy address {me['client_ip']}, shared by every visitor")
+                return False
+        except ValueError:
+            pass
+        throttled = exhaust(lambda attempt: f"203.0.113.{attempt}")
+        if throttled is None or not throttled.headers.get("Retry-After"):
+            print("❌ Failed - spoofed X-Forwarded-For values were not throttled with Retry-After")
+            return False
+        self.tests_passed += 1
+        print(f"✅ Passed - keyed on {me['client_ip']}, Retry-After: {throttled.headers['Retry-After']}s")
+        return True
+
     def test_ai_chat(self):
         """Test AI chat functionality"""
         print("\n🤖 Testing AI Chat...")
@@ -306,6 +381,61 @@ class TutoriaFacilAPITester:
         
         return success
 
+    def test_chat_faq_fast_path(self):
+        """Test that a question matching a seeded FAQ is answered without calling the LLM"""
+        print("\n⚡ Testing Chat FAQ Fast Path...")
+        
+        success, before = self.run_test("Chat Stats Before", "GET", "admin/chat/stats", 200, auth=self.admin_auth)
+        if not success:
+            return False
+        # Near-copy of the seeded "Como faço para resetar meu celular?"
+        chat_data = {"message": "como faço pra resetar meu celular", "session_id": None}
+        success, response = self.run_test("Chat FAQ Answer", "POST", "chat", 200, chat_data)
+        if not success:
+            return False
+        if response.get("source") != "faq" or not response.get("faq_id"):
+            print(f"❌ Failed - Expected an FAQ answer, got source={response.get('source')} faq_id={response.get('faq_id')}")
+            return False
+        
+        success, after = self.run_test("Chat Stats After", "GET", "admin/chat/stats", 200, auth=self.admin_auth)
+        if not success:
+            return False
+        if after.get("llm_calls_avoided", 0) <= before.get("llm_calls_avoided", 0):
+            print(f"❌ Failed - llm_calls_avoided did not increase ({before.get('llm_calls_avoided')} -> {after.get('llm_calls_avoided')})")
+            return False
+        print(f"   LLM calls avoided: {after['llm_calls_avoided']}, FAQ answer rate: {after.get('faq_answer_rate')}")
+        return True
+
+    def test_admin_import(self):
+        """Test NDJSON bulk import"""
+        print("\n📥 Testing Bulk Import...")
+        
+        success, faqs = self.run_test("Get FAQs for Import", "GET", "faqs", 200)
+        if not success or not faqs:
+            return success
+        # Re-import an existing FAQ, keyed on its question, so the test leaves the data as it found it
+        faq = faqs[0]
+        row = {"question": faq["question"], "answer": faq["answer"], "category": faq["category"], "order": faq["order"]}
+        body = json.dumps(row) + "\n" + "{not json\n"
+        
+        url = f"{self.base_url}/admin/import/faqs"
+        self.tests_run += 1
+        print(f"\n🔍 Testing Import FAQs...")
+        print(f"   URL: POST {url}")
+        response = self.session.post(url, data=body.encode("utf-8"), headers={'Content-Type': 'application/x-ndjson'}, auth=self.admin_auth)
+        if response.status_code != 200:
+            print(f"❌ Failed - Expected 200, got {response.status_code}")
+            return False
+        stats = response.json()
+        if stats.get("rows") != 2 or stats.get("errors") != 1 or stats.get("inserted") != 0:
+            print(f"❌ Failed - Unexpected import stats: {stats}")
+            return False
+        self.tests_passed += 1
+        print(f"✅ Passed - {stats['unchanged']} unchanged, {stats['updated']} updated, {stats['errors']} errors")
+        
+        invalid, _ = self.run_test("Import Unknown Kind", "POST", "admin/import/unknown", 404, data={}, auth=self.admin_auth)
+        return invalid
+
     def test_admin_auth(self):
         """Test admin authentication"""
         print("\n🔐 Testing Admin Authentication...")
@@ -319,6 +449,74 @@ class TutoriaFacilAPITester:
         
         return success
 
+    def test_trending_tutorials(self):
+        """Test trending tutorials ranking"""
+        success, tutorials = self.run_test("Trending Tutorials", "GET", "tutorials/trending", 200, params={"limit": 5})
+        if success:
+            print(f"   Trending tutorials: {len(tutorials)}")
+        return success
+
+    def test_leaderboards(self):
+        """Test top-rated and most-viewed leaderboards"""
+        success, top_rated = self.run_test("Top Rated", "GET", "leaderboards/top-rated", 200, params={"limit": 5})
+        if success and top_rated:
+            print(f"   Best rated: {top_rated[0]['title']} ({top_rated[0].get('rating_avg')})")
+        viewed, _ = self.run_test("Most Viewed", "GET", "leaderboards/most-viewed", 200, params={"limit": 5})
+        return success and viewed
+
+    def test_autocomplete(self):
+        """Test type-ahead suggestions"""
+        success, result = self.run_test("Autocomplete", "GET", "autocomplete", 200, params={"q": "celu"})
+        if success:
+            print(f"   Suggestions: {[s['text'] for s in result.get('suggestions', [])]}")
+        return success
+
+    def test_admin_bulk(self):
+        """Test bulk admin operations"""
+        success, faqs = self.run_test("Get FAQs for Bulk", "GET", "faqs", 200)
+        if not success or not faqs:
+            return success
+        # Reorder with the current order, so the test leaves the data as it found it
+        operations = [{"op": "reorder", "collection": "faqs", "ids": [f["id"] for f in faqs]}]
+        success, result = self.run_test("Bulk Reorder FAQs", "POST", "admin/bulk", 200, data={"operations": operations}, auth=self.admin_auth)
+        if success:
+            print(f"   Results: {result.get('results')}")
+        invalid, _ = self.run_test("Bulk Invalid Operation", "POST", "admin/bulk", 400,
+                                   data={"operations": [{"op": "explode", "collection": "faqs", "id": "x"}]}, auth=self.admin_auth)
+        return success and invalid
+
+    def test_admin_maintenance(self):
+        """Test maintenance job status"""
+        success, jobs = self.run_test("Maintenance Jobs", "GET", "admin/maintenance", 200, auth=self.admin_auth)
+        if success:
+            for job in jobs:
+                print(f"   {job['name']}: {job['status']} ({job['runs']} runs)")
+        missing, _ = self.run_test("Run Unknown Job", "POST", "admin/maintenance/unknown/run", 404, auth=self.admin_auth)
+        return success and missing
+
+    def test_admin_ingestion(self):
+        """Test write ingestion queue stats"""
+        success, stats = self.run_test("Ingestion Stats", "GET", "admin/ingestion", 200, auth=self.admin_auth)
+        if success:
+            for name, stream in stats.get("streams", {}).items():
+                print(f"   {name}: {stream['mode']}, {stream['written']} written in {stream['batches']} batches")
+        return success
+
+    def test_admin_profiler(self):
+        """Test slow query profiler report"""
+        print("\n🐢 Testing Query Profiler...")
+        
+        success, report = self.run_test("Profiler Report", "GET", "admin/profiler", 200, auth=self.admin_auth, params={"limit": 10})
+        if success:
+            print(f"   Slow query shapes: {len(report.get('shapes', []))}")
+        self.run_test("Profiler Report Unauthorized", "GET", "admin/profiler", 401, auth=('admin', 'wrongpassword'))
+        
+        breaker_ok, breaker = self.run_test("DB Circuit Breaker", "GET", "admin/db/breaker", 200, auth=self.admin_auth)
+        if breaker_ok:
+            print(f"   Breaker state: {breaker.get('state')} (trips: {breaker.get('trips')})")
+        
+        return success and breaker_ok
+
     def test_seed_data(self):
         """Test seed data creation"""
         print("\n🌱 Testing Seed Data...")
@@ -337,6 +535,7 @@ def main():
     # Basic endpoints
     test_results.append(tester.test_root_endpoint())
     test_results.append(tester.test_stats_endpoint())
+    test_results.append(tester.test_health_endpoints())
     
     # Authentication
     test_results.append(tester.test_admin_auth())
@@ -345,15 +544,27 @@ def main():
     test_results.append(tester.test_categories_crud())
     test_results.append(tester.test_tutorials_crud())
     test_results.append(tester.test_comments_crud())
+    test_results.append(tester.test_trending_tutorials())
+    test_results.append(tester.test_leaderboards())
+    test_results.append(tester.test_autocomplete())
+    test_results.append(tester.test_admin_ingestion())
+    test_results.append(tester.test_admin_bulk())
+    test_results.append(tester.test_admin_maintenance())
     test_results.append(tester.test_faqs_crud())
     test_results.append(tester.test_blog_crud())
     test_results.append(tester.test_contact_crud())
+    test_results.append(tester.test_rate_limit())
     
     # AI functionality
     test_results.append(tester.test_ai_chat())
     
     # Seed data
     test_results.append(tester.test_seed_data())
+    test_results.append(tester.test_chat_faq_fast_path())
+    test_results.append(tester.test_admin_import())
+    
+    # Diagnostics
+    test_results.append(tester.test_admin_profiler())
     
     # Print results
     print("\n" + "=" * 50)
@@ -1,38 +1,136 @@
-import { useState } from "react";
+import { useState, useEffect, useRef } from "react";
 import { useNavigate } from "react-router-dom";
-import { Search, Sparkles } from "lucide-react";
+import { Search, Sparkles, BookOpen, Newspaper, Folder, Tag } from "lucide-react";
+import axios from "axios";
 import { Input } from "@/components/ui/input";
 import { Button } from "@/components/ui/button";
 
-export const SearchBar = ({ 
-  placeholder = "Buscar tutoriais...", 
+const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
+const SUGGEST_DELAY_MS = 120;
+
+const SUGGESTION_ICONS = {
+  tutorial: BookOpen,
+  blog: Newspaper,
+  category: Folder,
+  tag: Tag,
+};
+
+export const SearchBar = ({
+  placeholder = "Buscar tutoriais...",
   onSearch,
   showAIHint = true,
   className = ""
 }) => {
   const [query, setQuery] = useState("");
+  const [suggestions, setSuggestions] = useState([]);
+  const [activeIndex, setActiveIndex] = useState(-1);
+  const [open, setOpen] = useState(false);
   const navigate = useNavigate();
+  const containerRef = useRef(null);
+
+  const close = () => {
+    setOpen(false);
+    setActiveIndex(-1);
+  };
+
+  useEffect(() => {
+    if (!query.trim()) {
+      setSuggestions([]);
+      return;
+    }
+    const controller = new AbortController();
+    const timer = setTimeout(async () => {
+      try {
+        const response = await axios.get(`${API}/autocomplete`, {
+          params: { q: query },
+          signal: controller.signal,
+        });
+        setSuggestions(response.data.suggestions);
+        setActiveIndex(-1);
+      } catch (error) {
+        if (!axios.isCancel(error)) setSuggestions([]);
+      }
+    }, SUGGEST_DELAY_MS);
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [query]);
+
+  useEffect(() => {
+    const handleClickOutside = (e) => {
+      if (containerRef.current && !containerRef.current.contains(e.target)) close();
+    };
+    document.addEventListener("mousedown", handleClickOutside);
+    return () => document.removeEventListener("mousedown", handleClickOutside);
+  }, []);
+
+  const search = (text) => {
+    if (onSearch) {
+      onSearch(text);
+    } else {
+      navigate(`/tutoriais?busca=${encodeURIComponent(text)}`);
+    }
+  };
+
+  const selectSuggestion = (suggestion) => {
+    close();
+    if (suggestion.type === "tutorial") {
+      navigate(`/tutoriais/${suggestion.slug}`);
+    } else if (suggestion.type === "blog") {
+      navigate(`/blog/${suggestion.slug}`);
+    } else if (suggestion.type === "category") {
+      navigate(`/tutoriais?categoria=${suggestion.slug}`);
+    } else {
+      setQuery(suggestion.text);
+      search(suggestion.text);
+    }
+  };
 
   const handleSubmit = (e) => {
     e.preventDefault();
+    if (open && activeIndex >= 0 && suggestions[activeIndex]) {
+      selectSuggestion(suggestions[activeIndex]);
+      return;
+    }
     if (!query.trim()) return;
-    
-    if (onSearch) {
-      onSearch(query);
-    } else {
-      navigate(`/tutoriais?busca=${encodeURIComponent(query)}`);
+    close();
+    search(query);
+  };
+
+  const handleKeyDown = (e) => {
+    if (!open || suggestions.length === 0) return;
+    if (e.key === "ArrowDown") {
+      e.preventDefault();
+      setActiveIndex((i) => (i + 1) % suggestions.length);
+    } else if (e.key === "ArrowUp") {
+      e.preventDefault();
+      setActiveIndex((i) => (i <= 0 ? suggestions.length - 1 : i - 1));
+    } else if (e.key === "Escape") {
+      close();
     }
   };
 
+  const showSuggestions = open && suggestions.length > 0;
+
   return (
     <form onSubmit={handleSubmit} className={`relative ${className}`} data-testid="search-bar">
-      <div className="relative">
+      <div className="relative" ref={containerRef}>
         <Search className="absolute left-4 top-1/2 -translate-y-1/2 w-5 h-5 text-[#A1A1AA]" />
         <Input
           type="text"
           value={query}
-          onChange={(e) => setQuery(e.target.value)}
+          onChange={(e) => {
+            setQuery(e.target.value);
+            setOpen(true);
+          }}
+          onFocus={() => setOpen(true)}
+          onKeyDown={handleKeyDown}
           placeholder={placeholder}
+          autoComplete="off"
+          role="combobox"
+          aria-expanded={showSuggestions}
+          aria-autocomplete="list"
           className="w-full pl-12 pr-28 h-14 bg-[#18181B] border-[#27272A] focus:border-[#8B5CF6] text-white text-base rounded-xl"
           data-testid="search-input"
         />
@@ -43,8 +141,39 @@ export const SearchBar = ({
         >
           Buscar
         </Button>
+
+        {showSuggestions && (
+          <ul
+            role="listbox"
+            className="absolute z-50 left-0 right-0 mt-2 py-2 bg-[#18181B] border border-[#27272A] rounded-xl shadow-lg text-left"
+            data-testid="search-suggestions"
+          >
+            {suggestions.map((suggestion, index) => {
+              const Icon = SUGGESTION_ICONS[suggestion.type] || Search;
+              return (
+                <li
+                  key={`${suggestion.type}-${suggestion.slug || suggestion.text}`}
+                  role="option"
+                  aria-selected={index === activeIndex}
+                  onMouseDown={(e) => {
+                    e.preventDefault();
+                    selectSuggestion(suggestion);
+                  }}
+                  onMouseEnter={() => setActiveIndex(index)}
+                  className={`flex items-center gap-3 px-4 py-2 cursor-pointer text-sm ${
+                    index === activeIndex ? "bg-[#27272A] text-white" : "text-[#D4D4D8]"
+                  }`}
+                  data-testid="search-suggestion"
+                >
+                  <Icon className="w-4 h-4 text-[#8B5CF6] shrink-0" />
+                  <span className="truncate">{suggestion.text}</span>
+                </li>
+              );
+            })}
+          </ul>
+        )}
       </div>
-      
+
       {showAIHint && (
         <p className="mt-3 text-sm text-[#A1A1AA] flex items-center gap-2">
           <Sparkles className="w-4 h-4 text-[#8B5CF6]" />
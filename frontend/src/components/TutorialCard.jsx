@@ -1,6 +1,7 @@
 import { Link } from "react-router-dom";
 import { Eye, Star, ArrowRight } from "lucide-react";
 import { Badge } from "@/components/ui/badge";
+import { cardImageProps } from "@/lib/utils";
 
 export const TutorialCard = ({ tutorial, featured = false }) => {
   const averageRating = tutorial.rating_count > 0 
@@ -16,7 +17,7 @@ export const TutorialCard = ({ tutorial, featured = false }) => {
       {/* Image */}
       <div className="relative h-48 overflow-hidden">
         <img
-          src={tutorial.image_url || "https://images.unsplash.com/photo-1517694712202-14dd9538aa97?w=800"}
+          {...cardImageProps(tutorial.image_url || "https://images.unsplash.com/photo-1517694712202-14dd9538aa97?w=800")}
           alt={tutorial.title}
           className="w-full h-full object-cover transition-transform duration-500 group-hover:scale-110"
         />
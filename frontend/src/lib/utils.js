@@ -4,3 +4,29 @@ import { twMerge } from "tailwind-merge"
 export function cn(...inputs) {
   return twMerge(clsx(inputs));
 }
+
+const IMAGE_API = `${process.env.REACT_APP_BACKEND_URL}/api/images`;
+const CARD_IMAGE_WIDTHS = [320, 480, 640, 800];
+
+// Resized WebP/AVIF variants served by the backend image pipeline
+export function imageVariant(url, width) {
+  return `${IMAGE_API}?url=${encodeURIComponent(url)}&w=${width}`;
+}
+
+export function cardImageProps(url) {
+  return {
+    src: imageVariant(url, 800),
+    srcSet: CARD_IMAGE_WIDTHS.map((width) => `${imageVariant(url, width)} ${width}w`).join(", "),
+    sizes: "(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw",
+    loading: "lazy",
+    decoding: "async",
+    // Hosts the pipeline doesn't proxy fall back to the original image
+    onError: (event) => {
+      const img = event.currentTarget;
+      if (img.dataset.fallback) return;
+      img.dataset.fallback = "true";
+      img.removeAttribute("srcset");
+      img.src = url;
+    },
+  };
+}
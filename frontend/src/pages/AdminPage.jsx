@@ -19,6 +19,7 @@ import {
   SelectValue,
 } from "@/components/ui/select";
 import { Switch } from "@/components/ui/switch";
+import { Checkbox } from "@/components/ui/checkbox";
 import { Label } from "@/components/ui/label";
 import { toast } from "sonner";
 import axios from "axios";
@@ -49,6 +50,7 @@ export default function AdminPage() {
 
   const [isDialogOpen, setIsDialogOpen] = useState(false);
   const [editingItem, setEditingItem] = useState(null);
+  const [selectedTutorials, setSelectedTutorials] = useState([]);
 
   const authHeader = {
     auth: { username: "admin", password },
@@ -136,6 +138,27 @@ export default function AdminPage() {
     }
   };
 
+  const toggleTutorialSelection = (id, checked) => {
+    setSelectedTutorials((selected) => checked ? [...selected, id] : selected.filter((s) => s !== id));
+  };
+
+  // One request for the whole selection, applied server-side as a single bulk write
+  const bulkTutorials = async (operation, successMessage) => {
+    if (selectedTutorials.length === 0) return;
+    if (operation.op === "delete" && !confirm(`Excluir ${selectedTutorials.length} tutoriais?`)) return;
+    try {
+      await axios.post(`${API}/admin/bulk`, {
+        operations: [{ ...operation, collection: "tutorials", ids: selectedTutorials }],
+      }, authHeader);
+      toast.success(successMessage);
+      setSelectedTutorials([]);
+      fetchAllData();
+    } catch (error) {
+      console.error("Error applying bulk operation:", error);
+      toast.error("Erro ao aplicar alterações em lote");
+    }
+  };
+
   // Category CRUD
   const handleCategorySubmit = async (e) => {
     e.preventDefault();
@@ -408,8 +431,39 @@ export default function AdminPage() {
                 <p className="text-[#A1A1AA] text-center py-8">Nenhum tutorial cadastrado</p>
               ) : (
                 <div className="space-y-3">
+                  {selectedTutorials.length > 0 && (
+                    <div className="flex flex-wrap items-center gap-2 p-3 bg-[#8B5CF6]/10 border border-[#8B5CF6]/30 rounded-lg" data-testid="bulk-actions">
+                      <span className="text-sm text-white mr-2">{selectedTutorials.length} selecionados</span>
+                      <Button size="sm" variant="secondary" onClick={() => bulkTutorials({ op: "update", fields: { is_featured: true } }, "Tutoriais destacados!")}>
+                        Destacar
+                      </Button>
+                      <Button size="sm" variant="secondary" onClick={() => bulkTutorials({ op: "update", fields: { is_featured: false } }, "Destaques removidos!")}>
+                        Remover destaque
+                      </Button>
+                      <Select value="" onValueChange={(v) => bulkTutorials({ op: "recategorize", category: v }, "Categoria alterada!")}>
+                        <SelectTrigger className="w-48 h-9 bg-[#27272A] border-transparent text-white">
+                          <SelectValue placeholder="Mover para categoria" />
+                        </SelectTrigger>
+                        <SelectContent className="bg-[#18181B] border-[#27272A]">
+                          {categories.map((cat) => (
+                            <SelectItem key={cat.id} value={cat.id}>{cat.name}</SelectItem>
+                          ))}
+                        </SelectContent>
+                      </Select>
+                      <Button size="sm" variant="ghost" onClick={() => bulkTutorials({ op: "delete" }, "Tutoriais excluídos!")} className="text-red-500 hover:text-red-400 hover:bg-red-500/10">
+                        <Trash2 className="w-4 h-4 mr-1" />
+                        Excluir
+                      </Button>
+                    </div>
+                  )}
                   {tutorials.map((tutorial) => (
                     <div key={tutorial.id} className="flex items-center justify-between p-4 bg-[#27272A] rounded-lg">
+                      <Checkbox
+                        checked={selectedTutorials.includes(tutorial.id)}
+                        onCheckedChange={(checked) => toggleTutorialSelection(tutorial.id, checked === true)}
+                        className="mr-4"
+                        aria-label={`Selecionar ${tutorial.title}`}
+                      />
                       <div className="flex-1 min-w-0">
                         <h3 className="font-medium text-white truncate">{tutorial.title}</h3>
                         <p className="text-sm text-[#A1A1AA]">/{tutorial.slug}</p>
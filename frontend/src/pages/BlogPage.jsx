@@ -2,6 +2,7 @@ import { useState, useEffect } from "react";
 import { Link } from "react-router-dom";
 import { Calendar, ArrowRight, Tag } from "lucide-react";
 import { Badge } from "@/components/ui/badge";
+import { cardImageProps } from "@/lib/utils";
 import axios from "axios";
 import { format } from "date-fns";
 import { ptBR } from "date-fns/locale";
@@ -83,7 +84,7 @@ export default function BlogPage() {
                 {/* Image */}
                 <div className={`relative overflow-hidden ${index === 0 ? "h-64 lg:h-80" : "h-48"}`}>
                   <img
-                    src={post.image_url || "https://images.unsplash.com/photo-1519389950473-47ba0277781c?w=800"}
+                    {...cardImageProps(post.image_url || "https://images.unsplash.com/photo-1519389950473-47ba0277781c?w=800")}
                     alt={post.title}
                     className="w-full h-full object-cover transition-transform duration-500 group-hover:scale-110"
                   />